@@ -12,6 +12,7 @@ from bokeh.charts import defaults
 import os
 
 import tracedatabase as td
+import tracestore as ts
 import tracemisc as tm
 
 SCREEN_WIDTH = 1560
@@ -20,21 +21,16 @@ defaults.width = int(SCREEN_WIDTH * 0.3)
 defaults.height = defaults.width
 
 
-class Trace(object):
+class Trace(ts.TraceStore):
     """ Trace of Multi2Sim """
 
-    def __init__(self, file_name):
+    def __init__(self, file_name, backend='sqlite'):
+        super(Trace, self).__init__(file_name, backend)
 
         # Trace information
         self.__file_name = file_name
         self.__color = tm.get_random_color()
 
-        # Load database
-        self.__database = td.load_database(self.__file_name)
-
-    def __build_database(self):
-        self.__database = td.load_database(self.__file_name)
-
     def get_file_name(self):
         """ Get file name """
         try:
@@ -50,52 +46,9 @@ class Trace(object):
         """ Get color assigned to trace """
         return self.__color
 
-    def get_db(self):
-        """ Get database """
-        return self.__database
-
-    def get_column(self, table_name, column_name):
-        """ Get a column from database """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + column_name + ' FROM ' + table_name
-
-        return cursor.execute(sql_query)
-
-    def get_column_with_func_cond(self,
-                                  table_name, column_name,
-                                  func_name, conditions=''):
-        """ Get a column from database, apply with function """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + func_name
-        sql_query += '(' + column_name + ') FROM ' + table_name + ' '
-        sql_query += conditions
-        return cursor.execute(sql_query).fetchone()[0]
-
-    def get_max(self, table_name, column_name, conditions=''):
-        """ Get the maximum of a column from database """
-        return int(self.get_column_with_func_cond(table_name, column_name,
-                                                  'MAX', conditions))
-
-    def get_sum(self, table_name, column_name, conditions=''):
-        """ Get the sum of a column from database """
-        return int(self.get_column_with_func_cond(table_name, column_name,
-                                                  'SUM', conditions))
-
-    def get_count(self, table_name, column_name, conditions=''):
-        """ Get the count of a column from database """
-        return int(self.get_column_with_func_cond(table_name, column_name,
-                                                  'COUNT', conditions))
-
     def print_table_columns_with_func(self, table_name, func_name):
         """ Print table columns information """
-        cursor = self.__database.cursor()
-        cursor.execute('SELECT * from ' + table_name)
+        cursor = self.get_db().execute('SELECT * from ' + table_name)
 
         field_names = [i[0] for i in cursor.description]
         print 'Table: ' + table_name
@@ -170,33 +123,28 @@ class Trace(object):
 
     def __get_memory_access_detailed(self):
         """ Get all memory access types """
-        sql_query = 'SELECT DISTINCT access_location, access_type FROM memory '
-        sql_query += 'ORDER by  access_location, access_type'
-        dataframe = pd.read_sql_query(sql_query, self.get_db())
-        return dataframe
+        sql_query = 'SELECT DISTINCT module, type FROM mem_access'
+        dataframe = self.decode(self.read_sql_query(sql_query),
+                                ['module', 'type'])
+        return dataframe.sort_values(['module', 'type'])
 
     def __get_memory_access_types(self, mode='overview'):
         """ Get overview of memory access types """
         access = collections.OrderedDict()
 
         if mode == 'overview':
-            access['M M: Load'] = 'access_type="load" \
-                                   and access_location!="LDS[0]"'
-            access['M M: Store'] = 'access_type="store" \
-                                    and access_location!="LDS[0]"'
-            access['M M: NC Store'] = 'access_type="nc_store"'
-            access['LDS: Load'] = 'access_type="load" \
-                                   and access_location="LDS[0]"'
-            access['LDS: Store'] = 'access_type="store" \
-                                   and access_location="LDS[0]"'
+            access['M M: Load'] = 'type=="load" and module!="LDS[0]"'
+            access['M M: Store'] = 'type=="store" and module!="LDS[0]"'
+            access['M M: NC Store'] = 'type=="nc_store"'
+            access['LDS: Load'] = 'type=="load" and module=="LDS[0]"'
+            access['LDS: Store'] = 'type=="store" and module=="LDS[0]"'
         elif mode == 'detailed':
             access_combinations = self.__get_memory_access_detailed()
             for index, row in access_combinations.iterrows():
-                loc = row['access_location']
-                aty = row['access_type']
-                sql_query = 'access_location="' + loc
-                sql_query += '" and access_type="' + aty + '"'
-                access[loc + " " + aty] = sql_query
+                loc = row['module']
+                aty = row['type']
+                query = 'module=="' + loc + '" and type=="' + aty + '"'
+                access[loc + " " + aty] = query
 
         return access
 
@@ -210,11 +158,20 @@ class Trace(object):
         col_cycle = []
         col_index = []
 
+        # Conditions are on decoded values, for DataFrame.query
+        columns = self.get_column_store()
+        if columns is not None:
+            memory_df = columns.get_frame('mem_access',
+                                          ['length', 'type', 'module'])
+        else:
+            sql_query = 'SELECT length, type, module FROM mem_access'
+            sql_query += ' ORDER by uid'
+            memory_df = self.read_sql_query(sql_query)
+        memory_df = self.decode(memory_df, ['type', 'module'])
+
         for key, value in access.iteritems():
-            sql_query = 'SELECT length FROM memory'
-            sql_query += ' WHERE ' + value
-            sql_query += ' ORDER by line'
-            dataframe = pd.read_sql_query(sql_query, self.get_db())
+            dataframe = memory_df.query(value)
+            dataframe = dataframe.reset_index(drop=True)
 
             color = tm.get_random_color()
 
@@ -287,15 +244,17 @@ class Trace(object):
 class Traces(object):
     """ Traces """
 
-    def __init__(self, trace_files):
+    def __init__(self, trace_files, backend='sqlite'):
 
         self.trace_files = trace_files
         self.traces = []
         self.plot_height = defaults.height
         self.plot_width = SCREEN_WIDTH - self.plot_height
 
+        # Build missing databases in parallel
+        td.build_databases(trace_files)
         for trace_file in trace_files:
-            trace = Trace(trace_file)
+            trace = Trace(trace_file, backend)
             self.traces.append(trace)
 
     def get_output_file_name(self):
@@ -348,7 +307,7 @@ class Traces(object):
             # Get the data from database
             sql_query = 'SELECT ' + x_column_name + ',' + y_column_name + \
                 ' FROM ' + table_name
-            df = pd.read_sql_query(sql_query, trace.get_db())
+            df = trace.read_sql_query(sql_query)
 
             # Plot the main view
             plot_title = trace.get_file_name() + " : " + \
@@ -432,10 +391,12 @@ class Traces(object):
         y_max = 1
         for trace in self.traces:
             if int(cu_id) != -1:
-                condition = 'WHERE cu=' + cu_id
+                condition = 'WHERE cu=?'
                 x_max = max(trace.get_max(
-                    "inst", "cycle_start + length", condition), x_max)
-                y_max = max(trace.get_count("inst", "line", condition), y_max)
+                    "inst", "cycle_start + length", condition,
+                    (int(cu_id),)), x_max)
+                y_max = max(trace.get_count(
+                    "inst", "line", condition, (int(cu_id),)), y_max)
             else:
                 x_max = max(trace.get_max(
                     "inst", "cycle_start + length"), x_max)
@@ -455,15 +416,16 @@ class Traces(object):
 
         for trace in self.traces:
             sql_query = 'SELECT cycle_start,length FROM inst'
+            params = ()
             if int(cu_id) != -1:
-                sql_query += ' WHERE cu=' + cu_id
+                sql_query += ' WHERE cu=?'
+                params = (int(cu_id),)
             sql_query += ' ORDER by line'
-            df = pd.read_sql_query(sql_query, trace.get_db())
+            df = trace.read_sql_query(sql_query, params)
 
             if int(cu_id) != -1:
-                condition = 'WHERE cu=' + cu_id
                 cycle_count = trace.get_max(
-                    "inst", "cycle_start + length", condition)
+                    "inst", "cycle_start + length", 'WHERE cu=?', params)
                 trace_title = trace.get_file_name() + ": " + str(cycle_count)
             else:
                 trace_title = trace.get_file_name()
@@ -599,7 +561,7 @@ class Traces(object):
                             FROM memory'
                 sql_query += ' WHERE ' + access_filter[index]
                 sql_query += ' ORDER by line'
-                df = pd.read_sql_query(sql_query, trace.get_db())
+                df = trace.read_sql_query(sql_query)
 
                 color = tm.get_random_color()
                 if mode == 'stat':
@@ -686,13 +648,16 @@ def main():
     parser.add_argument("-mh", "--memoryhist",
                         choices=['overview', 'detailed'],
                         help='Visualize memory access in histogram')
+    parser.add_argument("-b", "--backend",
+                        choices=['sqlite', 'columnar'], default='sqlite',
+                        help='Read columns from sqlite or the column store')
     args = parser.parse_args()
 
     # Sort the files in human natural order
     args.traceFiles.sort(key=tm.natural_keys)
 
     # Traces
-    traces = Traces(args.traceFiles)
+    traces = Traces(args.traceFiles, args.backend)
 
     # Statistics
     if args.stat:
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+""" Trace ingest benchmark for Multi2Sim """
+
+import argparse
+import gzip
+import re
+import time
+
+import traceregex as tr
+import tracetoken as tt
+
+
+def read_lines(trace_file):
+    """ Read all lines of a trace into memory """
+    if trace_file.endswith('.gz'):
+        with gzip.open(trace_file, 'rb') as trace_gz:
+            return trace_gz.readlines()
+    with open(trace_file, 'r') as trace_txt:
+        return trace_txt.readlines()
+
+
+def scan_regex(lines):
+    """ Classify lines the way the regex parser used to """
+    events = 0
+    for line in lines:
+        if 'clk' in line:
+            int(re.search(r'(\d+)', line).group(1))
+            events += 1
+        if 'si.' in line:
+            tr.get_inst_uid(line)
+            if tr.parse_inst_exe(line) is not None:
+                tr.parse_inst_exe(line).groupdict()
+                events += 1
+            elif tr.parse_inst_new(line) is not None:
+                tr.parse_inst_new(line).groupdict()
+                events += 1
+            elif tr.parse_inst_end(line) is not None:
+                tr.parse_inst_end(line).groupdict()
+                events += 1
+        if 'mem.' in line:
+            tr.get_mem_uid(line)
+            if tr.parse_mem_acc(line) is not None:
+                tr.parse_mem_acc(line).groupdict()
+                events += 1
+            elif tr.parse_mem_new(line) is not None:
+                tr.parse_mem_new(line).groupdict()
+                events += 1
+            elif tr.parse_mem_end(line) is not None:
+                events += 1
+    return events
+
+
+def scan_tokenizer(lines):
+    """ Classify lines with the single-pass tokenizer """
+    events = 0
+    tokenize = tt.tokenize
+    for line in lines:
+        if tokenize(line) is not None:
+            events += 1
+    return events
+
+
+def bench(name, func, lines, repeat):
+    """ Run func on lines and report the best time """
+    best = None
+    events = 0
+    for _ in range(repeat):
+        start = time.time()
+        events = func(lines)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(lines) / best / 1000.0
+    print '  ' + name.ljust(12) + '\t%.3f s\t%.0f klines/s\t%d events' % (
+        best, rate, events)
+    return best
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Multi2Sim trace ingest benchmark')
+    parser.add_argument('trace', nargs='+',
+                        help='Multi2Sim trace files')
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help='Number of runs, the best one is reported')
+    args = parser.parse_args()
+
+    for trace_file in args.trace:
+        lines = read_lines(trace_file)
+        print trace_file + ': ' + str(len(lines)) + ' lines'
+        regex_time = bench('regex', scan_regex, lines, args.repeat)
+        token_time = bench('tokenizer', scan_tokenizer, lines, args.repeat)
+        print '  speedup     \t%.1fx' % (regex_time / token_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,6 @@
 """ Trace Cycle visualizer for Multi2Sim """
 
 import argparse
-import pandas as pd
 import numpy as np
 from bokeh.charts import Histogram
 from bokeh.plotting import figure, show, output_file
@@ -10,103 +9,62 @@ from bokeh.io import gridplot
 
 import tracemisc as tm
 import tracedatabase as td
+import tracestore as ts
 
 FIGURE_WIDTH = 1100
 FIGURE_HEIGHT = 450
 
+# Instructions in each stage of each cu at each cycle
+CYCLE_TABLE = 'cycle_stage'
 
-class TraceCycleFigures(object):
+
+class TraceCycleFigures(ts.TraceStore):
     """TraceCycleFigures contains figures related to cycle tables """
 
     def __init__(self, trace_file):
-        self.__trace_file = trace_file
-
-        # Load database
-        self.__database = td.load_database(self.__trace_file)
-
-    def __build_database(self):
-        self.__database = td.load_database(self.__trace_file)
-
-    def get_column(self, table, column):
-        """ Get a column from database """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + column + ' FROM ' + table
-
-        return cursor.execute(sql_query)
-
-    def get_column_with_func_cond(self,
-                                  table, column,
-                                  func_name, conditions=''):
-        """ Get a column from database, apply with function """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + func_name
-        sql_query += '(' + column + ') FROM ' + table + ' '
-        sql_query += conditions
-        return cursor.execute(sql_query).fetchone()[0]
-
-    def get_max(self, table, column, conditions=''):
-        """ Get the maximum of a column from database """
-        return int(self.get_column_with_func_cond(table, column,
-                                                  'MAX', conditions))
-
-    def get_sum(self, table, column, conditions=''):
-        """ Get the sum of a column from database """
-        return int(self.get_column_with_func_cond(table, column,
-                                                  'SUM', conditions))
-
-    def get_count(self, table, column, conditions=''):
-        """ Get the count of a column from database """
-        return int(self.get_column_with_func_cond(table, column,
-                                                  'COUNT', conditions))
-
-    def get_column_list(self, table):
-        """Get all columns as a list"""
-        cursor = self.__database.cursor()
-        sql_query = "PRAGMA table_info(" + table + ")"
-        column_list = []
-        metadata = cursor.execute(sql_query)
-        for item in metadata:
-            if item[1] != 'cycle':
-                column_list.append(item[1])
-        return sorted(column_list)
-
-    def get_table_list(self):
-        """Get all tables as a list"""
-        cursor = self.__database.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        table_list = []
-        for item in cursor.fetchall():
-            table_list.append(item[0])
-        return sorted(table_list)
+        super(TraceCycleFigures, self).__init__(trace_file)
+
+    def get_cu_list(self):
+        """ Get unique cu as a sorted list """
+        sql_query = 'SELECT DISTINCT cu FROM ' + CYCLE_TABLE
+        return sorted(self.read_sql_query(sql_query)['cu'])
+
+    def get_stage_list(self):
+        """ Get stage columns of the cycle table as a list """
+        return [column for column in self.get_column_list(CYCLE_TABLE)
+                if column != 'cu']
 
     def plot_t_x_y(self, width, height,
-                   table, x_column, y_column,
+                   cu_id, x_column, y_column,
                    x_max=None, y_max=None):
-        """ Plot a column from a table """
+        """ Plot a column of a cu """
         plot_color = tm.get_random_color()
+        table = CYCLE_TABLE
+        condition = 'WHERE cu=?'
+        params = (int(cu_id),)
 
         # Get data from database
         sql_query = 'SELECT ' + x_column + ',' + y_column + \
-            ' FROM ' + table
-        dataframe = pd.read_sql_query(sql_query, self.__database)
+            ' FROM ' + table + ' ' + condition + ' ORDER by cycle'
+        dataframe = self.read_sql_query(sql_query, params)
 
         # Range
         if x_max is None:
-            x_max = int(self.get_max(table, x_column))
+            x_max = int(self.get_max(table, x_column, condition, params))
 
         if y_max is None:
-            y_max = int(self.get_max(table, y_column))
+            y_max = int(self.get_max(table, y_column, condition, params))
 
-        # Plot
-        plot_title = table + ' : ' + \
-            str(self.get_max(table, x_column)) + ' cycles / ' + \
-            str(self.get_count(table, y_column)) + ' ' + y_column
+        # Plot, stage columns add up to the cycles instructions spent in
+        # the stage, end to the instructions finished
+        if y_column == 'end':
+            total = ' insts ending'
+        else:
+            total = ' inst-cycles in ' + y_column
+        plot_title = 'cu ' + str(cu_id) + ' : ' + \
+            str(self.get_max(table, x_column, condition, params)) + \
+            ' cycles / ' + \
+            str(self.get_sum(table, y_column, condition, params)) + total
 
         plot = figure(webgl=True,
                       width=width,
@@ -115,7 +73,7 @@ class TraceCycleFigures(object):
                       y_range=(0, y_max),
                       title=plot_title)
         plot.xaxis.axis_label = x_column
-        plot.yaxis.axis_label = 'Count'
+        plot.yaxis.axis_label = 'Instructions'
 
         plot.segment(x0=dataframe[x_column],
                      y0=dataframe[y_column],
@@ -143,14 +101,14 @@ class TraceCycleFigures(object):
         return (plot, plot_hist)
 
     def plot_t_x_multi(self, width, height,
-                       table, x_column, y_column_list,
+                       cu_id, x_column, y_column_list,
                        x_range=None, y_range=None):
         """ Plot multiple columns, return a grid of figures """
         figures_vertical = []
 
         for y_column in sorted(y_column_list):
             plot, plot_hist = self.plot_t_x_y(
-                width, height, table, x_column, y_column, x_range, y_range)
+                width, height, cu_id, x_column, y_column, x_range, y_range)
             figures_vertical.append([plot, plot_hist])
         return figures_vertical
 
@@ -158,40 +116,42 @@ class TraceCycleFigures(object):
 class TraceCyclePlot(object):
     """Draw figures to file"""
 
-    def __init__(self, trace, table, xaxis, yaxis):
+    def __init__(self, trace, cu_list, xaxis, yaxis):
         self.__trace = trace.split('.')[0]
         self.__figures = TraceCycleFigures(trace)
 
-        # Table and Yaxis can be a list
-        self.__table = None
+        # CU and Yaxis can be a list
+        self.__cu = None
         self.__xaxis = xaxis
         self.__yaxis = None
 
         # Draw function
         self.__draw_func = None
 
-        # Check tables
-        trace_tables = self.__figures.get_table_list()
-        valid_tables = []
-        for item in table:
-            if '*' not in item and item in trace_tables:
-                valid_tables.append(item)
-            elif item == 'all':
-                for table in trace_tables:
-                    if 'cycle' in table:
-                        valid_tables.append(table)
-            else:
-                for table in trace_tables:
-                    if item[:-1] in table:
-                        valid_tables.append(table)
+        # A followed trace only has the cycles no instruction in flight
+        # can be in any more
+        database = self.__figures.get_db()
+        if td.is_following(database):
+            print trace + ' is still being followed, showing cycles up to ' \
+                + str(td.get_metadata(database).get('stage_cycle', 0))
+
+        # Check cu
+        trace_cu = self.__figures.get_cu_list()
+        valid_cu = []
+        for item in cu_list:
+            if item == 'all':
+                valid_cu = trace_cu
+                break
+            elif item.isdigit() and int(item) in trace_cu:
+                valid_cu.append(int(item))
 
-        # Sanity check, at least 1 valid table
-        if len(valid_tables) == 0:
-            print 'No valid table found in trace'
+        # Sanity check, at least 1 valid cu
+        if len(valid_cu) == 0:
+            print 'No valid cu found in trace'
             return
 
         # Check columns
-        trace_columns = self.__figures.get_column_list(valid_tables[0])
+        trace_columns = self.__figures.get_stage_list()
         valid_columns = []
         for item in yaxis:
             if '*' not in item and item in trace_columns:
@@ -205,20 +165,21 @@ class TraceCyclePlot(object):
                         valid_columns.append(table)
 
         # Check and bind draw function
-        if len(valid_tables) == 1:
-            self.__table = valid_tables[0]
+        if len(valid_cu) == 1:
+            self.__cu = valid_cu[0]
             self.__yaxis = valid_columns
-            self.__draw_func = self.__draw_single_table
+            self.__draw_func = self.__draw_single_cu
         else:
-            self.__table = valid_tables
+            self.__cu = valid_cu
             self.__yaxis = valid_columns
-            self.__draw_func = self.__draw_compare_tables
+            self.__draw_func = self.__draw_compare_cu
 
-    def __draw_single_table(self):
-        """ Show figures of multiple columns in a table """
+    def __draw_single_cu(self):
+        """ Show figures of multiple columns of a cu """
 
         # Output file
-        prefix = '_'.join([self.__trace, self.__table, self.__xaxis])
+        prefix = '_'.join([self.__trace, 'cu' + str(self.__cu),
+                           self.__xaxis])
         if len(self.__yaxis) > 1:
             last = str(len(self.__yaxis)) + '_cols'
         else:
@@ -228,38 +189,37 @@ class TraceCyclePlot(object):
 
         # Get figures
         figures = self.__figures.plot_t_x_multi(FIGURE_WIDTH, FIGURE_HEIGHT,
-                                                self.__table,
+                                                self.__cu,
                                                 self.__xaxis, self.__yaxis)
         plot = gridplot(figures)
         show(plot)
 
-    def __draw_compare_tables(self):
-        """ Compare multiple tables """
+    def __draw_compare_cu(self):
+        """ Compare multiple cu """
 
         # Sync X and Y range
-        max_xaxis = 0
-        for table in self.__table:
-            max_xaxis = max(max_xaxis, self.__figures.get_max(table, 'cycle'))
+        max_xaxis = self.__figures.get_max(CYCLE_TABLE, 'cycle')
 
         max_yaxis = {}
         for yaxis in self.__yaxis:
             max_val = 0
-            for table in self.__table:
-                max_val = max(max_val, self.__figures.get_max(table, yaxis))
+            for cu_id in self.__cu:
+                max_val = max(max_val, self.__figures.get_max(
+                    CYCLE_TABLE, yaxis, 'WHERE cu=?', (cu_id,)))
             max_yaxis[yaxis] = max_val
 
         for yaxis in self.__yaxis:
             figures = []
-            num_tables = str(len(self.__table)) + '_tables'
+            num_cu = str(len(self.__cu)) + '_cu'
             output_name = '_'.join(
-                [self.__trace, num_tables, self.__xaxis, yaxis])
+                [self.__trace, num_cu, self.__xaxis, yaxis])
             output_file(output_name + '.html', title=output_name)
 
-            for table in self.__table:
+            for cu_id in self.__cu:
                 xaxis = self.__xaxis
                 plot, plot_hist = self.__figures.plot_t_x_y(FIGURE_WIDTH,
                                                             FIGURE_HEIGHT,
-                                                            table,
+                                                            cu_id,
                                                             xaxis,
                                                             yaxis,
                                                             max_xaxis,
@@ -280,9 +240,10 @@ def main():
         description='Multi2Sim simulation trace cycle analyzer')
     parser.add_argument('trace', nargs=1,
                         help='Multi2Sim trace files')
-    parser.add_argument("-t", "--table", nargs='+',
-                        default="cycle_cu_0",
-                        help='Choose a table')
+    parser.add_argument("-c", "--cu", nargs='+',
+                        default=['0'],
+                        help='Choose compute units. '
+                             'Use \'all\' to compare all of them. ')
     parser.add_argument("-y", "--yaxis", nargs='+',
                         default="f",
                         help='Choose columns in the table as y axis. '
@@ -290,12 +251,12 @@ def main():
     args = parser.parse_args()
 
     trace = args.trace[0]
-    table = args.table
+    cu_list = args.cu
     xaxis = 'cycle'
     yaxis = args.yaxis
 
     # Plot cycle statistics
-    cycle_view = TraceCyclePlot(trace, table, xaxis, yaxis)
+    cycle_view = TraceCyclePlot(trace, cu_list, xaxis, yaxis)
     cycle_view.draw()
 
 
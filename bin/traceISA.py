@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 """ AMD Southern Islands instruction helper functions """
 
+import re
+import numpy as np
+
 SOP2 = [
     's_add_u32',
     's_sub_u32',
@@ -961,55 +964,154 @@ ISA['MIMG'] = MIMG
 ISA['EXP'] = EXP
 
 
-ISA_INFO = {}
 ISA_PALETTE = ['#59738F', '#B7C04F', '#919191', '#E59668', '#9AD7C3']
 
-# Build dictionary
-for key, value in ISA.iteritems():
-    for item in value:
-        # Decide type
-        if key.startswith('S'):
-            inst_type = 'S'
+# Format of mnemonics missing from the tables, and formats guessed from
+# their prefix to pick the execution unit
+FORMAT_UNKNOWN = 'UNKNOWN'
+FORMAT_PREFIXES = (('ds_', 'LDS'), ('buffer_', 'MUBUF'),
+                   ('tbuffer_', 'MTBUF'), ('image_', 'MIMG'))
+
+# Flags of an instruction packed in an integer, taken from the unit of its
+# mnemonic in the ISA tables. The low 4 bits sit where
+# traceparser.get_inst_type puts its flags, but mean something else: that
+# one looks for 'load' and 'store' in the asm, so eg. ds_read_* (LOAD) and
+# buffer_atomic_* (MEM) are classified differently
+INST_DS = 1
+INST_LOAD = 1 << 1
+INST_MEM = 1 << 2
+INST_SCALAR = 1 << 3
+INST_VECTOR = 1 << 4
+
+REGEX_MNEMONIC = re.compile(r'\w+')
+
+# Distinct asm strings whose info is cached, the cache starts over once full
+ASM_CACHE_SIZE = 65536
+
+
+def __classify(key, item):
+    """ Get (format, type, unit_action, color) of mnemonic item of format
+    key """
+    # Decide type
+    if key.startswith('S'):
+        inst_type = 'S'
+    else:
+        inst_type = 'V'
+
+    # Decide execution unit
+    if 'branch' in item:
+        unit_action = 'BRANCH'
+        unit_color = ISA_PALETTE[0]
+    elif key == 'LDS':
+        if 'read' in item:
+            unit_action = 'LDS LD'
+        elif 'write' in item:
+            unit_action = 'LDS ST'
+        else:
+            unit_action = 'LDS OT'
+        unit_color = ISA_PALETTE[1]
+    elif inst_type == 'S':
+        if 'load' in item:
+            unit_action = 'MEM LD'
+        elif 'store' in item:
+            unit_action = 'MEM ST'
         else:
-            inst_type = 'V'
-
-        # Decide execution unit
-        if 'branch' in item:
-            unit_action = 'BRANCH'
-            unit_color = ISA_PALETTE[0]
-        elif key == 'LDS':
-            if 'read' in item:
-                unit_action = 'LDS LD'
-            elif 'write' in item:
-                unit_action = 'LDS ST'
-            else:
-                unit_action = 'LDS OT'
-            unit_color = ISA_PALETTE[1]
-        elif inst_type == 'S':
-            if 'load' in item:
-                unit_action = 'MEM LD'
-            elif 'store' in item:
-                unit_action = 'MEM ST'
-            else:
-                unit_action = 'SALU'
-            unit_color = ISA_PALETTE[2]
-        elif key in ['MUBUF', 'MTBUF', 'MIMG']:
-            if 'load' in item:
-                unit_action = 'MEM LD'
-            elif 'store' in item:
-                unit_action = 'MEM ST'
-            else:
-                unit_action = 'MEM OT'
-            unit_color = ISA_PALETTE[3]
+            unit_action = 'SALU'
+        unit_color = ISA_PALETTE[2]
+    elif key in ['MUBUF', 'MTBUF', 'MIMG']:
+        if 'load' in item:
+            unit_action = 'MEM LD'
+        elif 'store' in item:
+            unit_action = 'MEM ST'
         else:
-            unit_action = 'VALU'
-            unit_color = ISA_PALETTE[4]
-        ISA_INFO[item] = (key, inst_type, unit_action, unit_color)
+            unit_action = 'MEM OT'
+        unit_color = ISA_PALETTE[3]
+    else:
+        unit_action = 'VALU'
+        unit_color = ISA_PALETTE[4]
+    return (key, inst_type, unit_action, unit_color)
+
+
+# Mnemonic -> (format, type, unit_action, color), shared with
+# instructions.InstructionInfo
+ISA_INFO = {}
+for format_name, mnemonics in ISA.iteritems():
+    for mnemonic_name in mnemonics:
+        ISA_INFO[mnemonic_name] = __classify(format_name, mnemonic_name)
+
+# asm -> ISA_INFO entry, mnemonic -> packed flags
+ASM_INFO = {}
+ISA_FLAGS = {}
+
+
+def get_mnemonic(asm):
+    """ Get mnemonic of an instruction, eg. s_mov_b32, '' if there is none """
+    match = REGEX_MNEMONIC.search(asm)
+    return '' if match is None else match.group()
+
+
+def get_mnemonic_info(mnemonic):
+    """ Get (format, type, unit_action, color) of a mnemonic
+
+    Mnemonics missing from the tables get format FORMAT_UNKNOWN, their type
+    and unit are guessed from their name. They are added to ISA_INFO.
+    """
+    try:
+        return ISA_INFO[mnemonic]
+    except KeyError:
+        pass
+
+    key = 'S' if mnemonic.startswith('s_') else 'V'
+    for prefix, format_name in FORMAT_PREFIXES:
+        if mnemonic.startswith(prefix):
+            key = format_name
+    info = (FORMAT_UNKNOWN,) + __classify(key, mnemonic)[1:]
+    ISA_INFO[mnemonic] = info
+    return info
 
 
 def get_info(asm):
     """ Get information of given instruction """
-    import re
-    pat_inst = re.compile(ur'(?P<inst>\w+)')
-    instruction = re.search(pat_inst, asm).groupdict()['inst']
-    return ISA_INFO[instruction]
+    try:
+        return ASM_INFO[asm]
+    except KeyError:
+        pass
+
+    info = get_mnemonic_info(get_mnemonic(asm))
+    if len(ASM_INFO) >= ASM_CACHE_SIZE:
+        ASM_INFO.clear()
+    ASM_INFO[asm] = info
+    return info
+
+
+def get_flags(mnemonic):
+    """ Get packed INST_* flags of a mnemonic
+
+    DS is set for LDS instructions, MEM for the memory units and LOAD for
+    loads of both.
+    """
+    try:
+        return ISA_FLAGS[mnemonic]
+    except KeyError:
+        pass
+
+    _, inst_type, unit_action, _ = get_mnemonic_info(mnemonic)
+    flags = INST_SCALAR if inst_type == 'S' else INST_VECTOR
+    if unit_action.startswith('LDS'):
+        flags |= INST_DS
+    if unit_action.startswith('MEM'):
+        flags |= INST_MEM
+    if unit_action.endswith(' LD'):
+        flags |= INST_LOAD
+    ISA_FLAGS[mnemonic] = flags
+    return flags
+
+
+def classify(asm):
+    """ Get packed INST_* flags of a sequence of asm strings, eg. the asm
+    column of inst, as an array. Each distinct string is classified once """
+    values, inverse = np.unique(np.asarray(asm, dtype=object),
+                                return_inverse=True)
+    flags = np.array([get_flags(get_mnemonic(value)) for value in values],
+                     dtype=np.uint8)
+    return flags[inverse]
@@ -2,210 +2,212 @@
 """ Trace Instruction visualizer for Multi2Sim """
 
 import argparse
-import pandas as pd
 import numpy as np
-from bokeh.models import BoxAnnotation
+from bokeh.models import ColumnDataSource
 from bokeh.charts import Histogram
 from bokeh.plotting import figure, show, output_file
 from bokeh.io import gridplot
 
 import tracemisc as tm
-import tracedatabase as td
+import tracestore as ts
 
 try:
-    from intervaltree import Interval, IntervalTree
+    from intervaltree import IntervalTree
 except ImportError:
     print 'Module not found! Install with "pip install intervaltree"'
 
 FIGURE_WIDTH = 1100
 FIGURE_HEIGHT = 450
 
+# Classes of instructions merged into intervals: name, then condition and
+# pattern matching their unit_action
+INTERVAL_CLASSES = (('mem_ld', 'LIKE', '%MEM LD%'),
+                    ('mem_st', 'LIKE', '%MEM ST%'),
+                    ('other', 'NOT LIKE', '%MEM LD%'))
 
-class TraceInstFigures(object):
-    """docstring for TraceInstFigures"""
+# Fill color of the intervals of each class
+INTERVAL_COLORS = {'mem_ld': 'red', 'mem_st': 'blue', 'other': 'green'}
 
-    def __init__(self, trace_file):
-
-        self.__trace_file = trace_file
-
-        # Load database
-        self.__database = td.load_database(self.__trace_file)
-
-    def __build_database(self):
-        self.__database = td.load_database(self.__trace_file)
-
-    def get_column(self, table, column):
-        """ Get a column from database """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + column + ' FROM ' + table
-
-        return cursor.execute(sql_query)
-
-    def get_column_with_func_cond(self,
-                                  table, column,
-                                  func_name, conditions=''):
-        """ Get a column from database, apply with function """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + func_name
-        sql_query += '(' + column + ') FROM ' + table + ' '
-        sql_query += conditions
-        return cursor.execute(sql_query).fetchone()[0]
-
-    def get_max(self, table, column, conditions=''):
-        """ Get the maximum of a column from database """
-        return int(self.get_column_with_func_cond(table, column,
-                                                  'MAX', conditions))
-
-    def get_sum(self, table, column, conditions=''):
-        """ Get the sum of a column from database """
-        return int(self.get_column_with_func_cond(table, column,
-                                                  'SUM', conditions))
-
-    def get_count(self, table, column, conditions=''):
-        """ Get the count of a column from database """
-        return int(self.get_column_with_func_cond(table, column,
-                                                  'COUNT', conditions))
-
-    def get_column_list(self, table):
-        """Get all columns as a list"""
-        cursor = self.__database.cursor()
-        sql_query = "PRAGMA table_info(" + table + ")"
-        column_list = []
-        metadata = cursor.execute(sql_query)
-        for item in metadata:
-            if item[1] != 'cycle':
-                column_list.append(item[1])
-        return sorted(column_list)
-
-    def get_table_list(self):
-        """Get all tables as a list"""
-        cursor = self.__database.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        table_list = []
-        for item in cursor.fetchall():
-            table_list.append(item[0])
-        return sorted(table_list)
 
-    def get_interval(self, dataframe_s, dataframe_e):
-        intervals = []
-
-        if len(dataframe_s) == 0 and len(dataframe_e) == 0:
-            return 0, []
-
-        interval_s = dataframe_s[0]
-        interval_e = dataframe_e[0]
-        intervals.append((interval_s, interval_e))
-        for index, value in enumerate(dataframe_s):
-            interval_s = value
-            interval_e = dataframe_e[index]
-            range_s, range_e = intervals[-1]
-            if range_s <= interval_s < range_e:
-                if interval_e > range_e:
-                    range_e = interval_e
-                    intervals[-1] = (range_s, range_e)
-            elif interval_s > range_e:
-                intervals.append((interval_s, interval_e))
-
-        cycle_count = 0
-        for interval in intervals:
-            interval_s, interval_e = interval
-            cycle_count += interval_e - interval_s
-
-        return cycle_count, intervals
-
-    def get_interval_cu_cond(self, cu_id, condition):
-        sql_query = 'SELECT start, start + length FROM inst WHERE cu=' + \
-            str(cu_id)
-        sql_query += ' AND unit_action ' + condition
-        sql_query += ' ORDER by inst_order'
-        dataframe = pd.read_sql_query(sql_query, self.__database)
-
-        dataframe_s = dataframe['start']
-        dataframe_e = dataframe['start + length']
-
-        # print cu_id, condition, len(dataframe_s), len(dataframe_e)
-        return self.get_interval(dataframe_s, dataframe_e)
+def merge_intervals(starts, ends, groups=None):
+    """ Merge [start, end) intervals into disjoint ones, for each group
 
-    def get_interval_cu(self, cu_id):
-        # MEM LD
-        mem_ld_cycle, mem_ld_interval = self.get_interval_cu_cond(
-            cu_id, 'LIKE "%MEM LD%"')
+    Returns group, start and end of the merged intervals as arrays, in
+    group and start order. Touching intervals are merged, empty ones are
+    left out.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if groups is None:
+        groups = np.zeros(len(starts), dtype=np.int64)
+    groups = np.asarray(groups, dtype=np.int64)
 
-        mem_ld_interval_tree = IntervalTree(
-            Interval(*iv) for iv in mem_ld_interval)
+    keep = ends > starts
+    starts, ends, groups = starts[keep], ends[keep], groups[keep]
+    if len(starts) == 0:
+        return groups, starts, ends
 
-        # MEM ST
-        mem_st_cycle, mem_st_interval = self.get_interval_cu_cond(
-            cu_id, 'LIKE "%MEM ST%"')
+    order = np.lexsort((starts, groups))
+    starts, ends, groups = starts[order], ends[order], groups[order]
 
-        mem_st_interval_tree = IntervalTree(
-            Interval(*iv) for iv in mem_st_interval)
+    # Move every group past the end of the one before, so one running max
+    # of the ends restarts at each group
+    new_group = np.zeros(len(groups), dtype=np.int64)
+    new_group[1:] = groups[1:] != groups[:-1]
+    shift = np.cumsum(new_group) * (ends.max() - starts.min() + 1)
+    reach = np.maximum.accumulate(ends + shift)
 
-        # OTHER
-        other_cycle, other_interval = self.get_interval_cu_cond(
-            cu_id, 'NOT LIKE "%MEM LD%"')
+    # An interval starting past everything before it starts a merged one
+    first = np.ones(len(starts), dtype=bool)
+    first[1:] = starts[1:] + shift[1:] > reach[:-1]
+    index = np.flatnonzero(first)
+    return groups[index], starts[index], np.maximum.reduceat(ends, index)
 
-        other_interval_tree = IntervalTree(
-            Interval(*iv) for iv in other_interval)
 
-        cycle = self.get_max('inst', 'start + length',
-                             ' WHERE cu=' + str(cu_id))
-        # print cycle, mem_cycle, other_cycle
+def get_covered_cycles(groups, starts, ends, count):
+    """ Get cycles covered by merged intervals of groups 0 to count - 1 """
+    return np.bincount(groups, weights=ends - starts,
+                       minlength=count).astype(np.int64)
 
-        info = {}
-        info['mem_ld'] = mem_ld_interval_tree
-        info['mem_st'] = mem_st_interval_tree
-        info['other'] = other_interval_tree
-        info['cycle_all'] = cycle
-        info['cycle_mem_ld'] = mem_ld_cycle
-        info['cycle_mem_st'] = mem_st_cycle
-        info['cycle_other'] = other_cycle
 
+class TraceInstFigures(ts.TraceStore):
+    """docstring for TraceInstFigures"""
+
+    def __init__(self, trace_file, backend='sqlite'):
+        super(TraceInstFigures, self).__init__(trace_file, backend)
+
+        # cu -> IntervalTree of resident work-groups, built on first lookup
+        self.__wg_trees = {}
+
+        # Merged intervals of all cu, built on first lookup
+        self.__intervals = None
+
+        # Database snapshot both were built from, a followed database
+        # moves on to new ones
+        self.__snapshot = None
+
+    def __check_snapshot(self):
+        """ Drop what was built from an older state of the database """
+        snapshot = self.get_snapshot()
+        if snapshot != self.__snapshot:
+            self.__wg_trees = {}
+            self.__intervals = None
+            self.__snapshot = snapshot
+
+    def get_interval(self, dataframe_s, dataframe_e):
+        """ Merge intervals, get covered cycles and merged intervals """
+        _, starts, ends = merge_intervals(dataframe_s, dataframe_e)
+        return int((ends - starts).sum()), zip(starts, ends)
+
+    def __get_unit_action_codes(self, condition, pattern):
+        sql_query = 'SELECT code FROM dict_unit_action'
+        sql_query += ' WHERE value ' + condition + ' ?'
+        return self.read_sql_query(sql_query, (pattern,))['code'].values
+
+    def __get_finished_inst(self):
+        """ Get cu, unit_action, start and end of finished instructions """
+        columns = ['cu', 'unit_action', 'start', 'length']
+        column_store = self.get_column_store()
+        if column_store is not None:
+            inst = column_store.get_columns('inst', columns)
+            finished = ~np.isnan(inst['length'])
+            inst = dict((column, values[finished])
+                        for column, values in inst.iteritems())
+        else:
+            sql_query = 'SELECT ' + ','.join(columns) + ' FROM inst'
+            sql_query += ' WHERE length IS NOT NULL'
+            dataframe = self.read_sql_query(sql_query)
+            inst = dict((column, dataframe[column].values)
+                        for column in columns)
+        starts = inst['start'].astype(np.int64)
+        ends = starts + inst['length'].astype(np.int64)
+        return (inst['cu'].astype(np.int64), inst['unit_action'], starts,
+                ends)
+
+    def get_intervals(self):
+        """ Get merged intervals of every cu and class of INTERVAL_CLASSES
+
+        Returns a dict of (starts, ends) arrays and a dict of covered
+        cycles, both keyed by (cu, class name). All cu and classes are
+        merged in one pass.
+        """
+        self.__check_snapshot()
+        if self.__intervals is not None:
+            return self.__intervals
+
+        cu_ids, unit_actions, starts, ends = self.__get_finished_inst()
+        cu_list = np.unique(cu_ids)
+        cu_index = np.searchsorted(cu_list, cu_ids)
+        class_count = len(INTERVAL_CLASSES)
+
+        # Group of an instruction is (cu, class), one copy per class
+        groups = []
+        class_starts = []
+        class_ends = []
+        for index, (_, condition, pattern) in enumerate(INTERVAL_CLASSES):
+            mask = np.in1d(unit_actions,
+                           self.__get_unit_action_codes(condition, pattern))
+            groups.append(cu_index[mask] * class_count + index)
+            class_starts.append(starts[mask])
+            class_ends.append(ends[mask])
+        merged_groups, merged_starts, merged_ends = merge_intervals(
+            np.concatenate(class_starts), np.concatenate(class_ends),
+            np.concatenate(groups))
+        cycles = get_covered_cycles(merged_groups, merged_starts, merged_ends,
+                                    len(cu_list) * class_count)
+
+        intervals = {}
+        covered = {}
+        bounds = np.searchsorted(merged_groups,
+                                 np.arange(len(cu_list) * class_count + 1))
+        for group in range(len(cu_list) * class_count):
+            key = (int(cu_list[group // class_count]),
+                   INTERVAL_CLASSES[group % class_count][0])
+            begin, end = bounds[group], bounds[group + 1]
+            intervals[key] = (merged_starts[begin:end],
+                              merged_ends[begin:end])
+            covered[key] = int(cycles[group])
+
+        self.__intervals = (intervals, covered)
+        return self.__intervals
+
+    def get_interval_cu(self, cu_id):
+        intervals, covered = self.get_intervals()
+        empty = np.array([], dtype=np.int64)
+
+        info = {}
+        for name, _, _ in INTERVAL_CLASSES:
+            key = (int(cu_id), name)
+            starts, ends = intervals.get(key, (empty, empty))
+            info[name] = IntervalTree.from_tuples(zip(starts, ends))
+            info['cycle_' + name] = covered.get(key, 0)
+
+        info['cycle_all'] = self.get_max('inst', 'start + length',
+                                         'WHERE cu=?', (int(cu_id),))
         return info
 
     def get_interval_cu_all(self):
-        sql_query = 'SELECT DISTINCT cu FROM inst'
-        cu_id = pd.read_sql_query(sql_query, self.__database)
-
-        for cu_id in sorted(cu_id['cu']):
-            self.get_interval_cu(cu_id)
-
-    def get_interval_boxannotation(self, cu_id):
-        info = self.get_interval_cu(cu_id)
-
-        mem_ld_interval_tree = info['mem_ld']
-        mem_st_interval_tree = info['mem_st']
-        other_interval_tree = info['other']
-
-        annotation_box_list = []
-        for interval in mem_ld_interval_tree:
-            start = interval.begin
-            end = interval.end
-            box = BoxAnnotation(left=start, right=end,
-                                fill_alpha=0.1, fill_color='red')
-            annotation_box_list.append(box)
-
-        for interval in mem_st_interval_tree:
-            start = interval.begin
-            end = interval.end
-            box = BoxAnnotation(left=start, right=end,
-                                fill_alpha=0.1, fill_color='blue')
-            annotation_box_list.append(box)
-
-        for interval in other_interval_tree:
-            start = interval.begin
-            end = interval.end
-            box = BoxAnnotation(left=start, right=end,
-                                fill_alpha=0.1, fill_color='green')
-            annotation_box_list.append(box)
-
-        return (annotation_box_list, info)
+        """ Get merged intervals and covered cycles of every cu """
+        return self.get_intervals()
+
+    def get_interval_source(self, cu_id):
+        """ Get merged intervals of all classes of a cu as one data source
+        of left, right and color, to be drawn by a single quad glyph """
+        intervals, _ = self.get_intervals()
+        empty = np.array([], dtype=np.int64)
+
+        lefts = []
+        rights = []
+        colors = []
+        for name, _, _ in INTERVAL_CLASSES:
+            starts, ends = intervals.get((int(cu_id), name), (empty, empty))
+            lefts.append(starts)
+            rights.append(ends)
+            colors.extend([INTERVAL_COLORS[name]] * len(starts))
+
+        return ColumnDataSource(data={'left': np.concatenate(lefts),
+                                      'right': np.concatenate(rights),
+                                      'color': colors})
 
     def plot_timeline_cu(self, width, height,
                          dataframe, cu_id,
@@ -215,19 +217,22 @@ class TraceInstFigures(object):
         plot_color = tm.get_random_color()
 
         # Range
-        condition = 'WHERE cu=' + str(cu_id)
+        condition = 'WHERE cu=?'
         if x_max is None:
-            x_max = int(self.get_max("inst", "start + length", condition))
+            x_max = int(self.get_max("inst", "start + length", condition,
+                                     (int(cu_id),)))
 
         if y_max is None:
-            y_max = int(self.get_count("inst", "uid", condition))
+            y_max = int(self.get_count("inst", "uid", condition,
+                                       (int(cu_id),)))
 
-        # Get box annotation and cycle info
-        boxannotations, info = self.get_interval_boxannotation(cu_id)
-        cycle_all = info['cycle_all']
-        cycle_mem_ld = info['cycle_mem_ld']
-        cycle_mem_st = info['cycle_mem_st']
-        cycle_other = info['cycle_other']
+        # Get cycle info
+        _, covered = self.get_intervals()
+        cycle_all = self.get_max('inst', 'start + length', condition,
+                                 (int(cu_id),))
+        cycle_mem_ld = covered.get((int(cu_id), 'mem_ld'), 0)
+        cycle_mem_st = covered.get((int(cu_id), 'mem_st'), 0)
+        cycle_other = covered.get((int(cu_id), 'other'), 0)
 
         # Title
         title = 'cu-' + str(cu_id) + ': '
@@ -252,9 +257,10 @@ class TraceInstFigures(object):
                      line_width=1,
                      color=dataframe['color'])
 
-        # Add box annotation
-        for box in boxannotations:
-            plot.add_layout(box)
+        # Shade intervals, one glyph for all of them
+        plot.quad(left='left', right='right', bottom=0, top=y_max,
+                  fill_color='color', fill_alpha=0.1, line_alpha=0,
+                  source=self.get_interval_source(cu_id))
 
         # Plot histogram on the right, ignore zeroes
         mean = np.round(dataframe['stall'].mean(), 2)
@@ -272,19 +278,76 @@ class TraceInstFigures(object):
 
         return (plot, plot_hist)
 
-    def plot_timeline_all_cu(self):
-        # Get unique cu
+    def get_cu_list(self):
+        """ Get unique cu as a sorted list """
+        columns = self.get_column_store()
+        if columns is not None:
+            return list(np.unique(columns.get_column('inst', 'cu')))
+
         sql_query = 'SELECT DISTINCT cu FROM inst'
-        cu_id = pd.read_sql_query(sql_query, self.__database)
+        cu_id = self.read_sql_query(sql_query)
+        return sorted(cu_id['cu'])
+
+    def get_wg_residency(self, cu_id):
+        """ Get work-groups mapped to a cu, ordered by start """
+        sql_query = 'SELECT wg, start, length FROM wg_residency'
+        sql_query += ' WHERE cu=? ORDER by start'
+        return self.read_sql_query(sql_query, (int(cu_id),))
+
+    def get_wg_tree(self, cu_id):
+        """ Get residency of a cu as an interval tree of work-groups """
+        self.__check_snapshot()
+        if cu_id not in self.__wg_trees:
+            dataframe = self.get_wg_residency(cu_id)
+            tree = IntervalTree()
+            for wg, start, length in dataframe.itertuples(index=False):
+                # Never unmapped, resident up to the end of the trace
+                end = float('inf') if length != length else start + length
+                tree.addi(start, max(end, start + 1), int(wg))
+            self.__wg_trees[cu_id] = tree
+        return self.__wg_trees[cu_id]
+
+    def get_resident_wgs(self, cu_id, cycle):
+        """ Get work-groups resident on a cu at a cycle, sorted """
+        return sorted(interval.data
+                      for interval in self.get_wg_tree(cu_id)[cycle])
+
+    def get_occupancy(self, cu_id):
+        """ Get cycles where the count of resident work-groups of a cu
+        changes and the count from then on """
+        dataframe = self.get_wg_residency(cu_id)
+        starts = dataframe['start'].values
+        ends = (dataframe['start'] + dataframe['length']).dropna().values
+        cycles = np.concatenate((starts, ends))
+        steps = np.concatenate((np.ones(len(starts), dtype=np.int64),
+                                -np.ones(len(ends), dtype=np.int64)))
+        order = np.argsort(cycles, kind='mergesort')
+        cycles, index = np.unique(cycles[order], return_index=True)
+        counts = np.cumsum(steps[order])
+        # Last count of each cycle, after all its maps and unmaps
+        last = np.append(index[1:], len(order)) - 1
+        return cycles.astype(np.int64), counts[last]
+
+    def get_timeline_cu(self, cu_id):
+        """ Get start, length, stall and color of a cu in program order """
+        columns = ['start', 'length', 'stall', 'color']
+        column_store = self.get_column_store()
+        if column_store is not None:
+            mask = column_store.get_column('inst', 'cu') == cu_id
+            dataframe = column_store.get_frame('inst', columns, mask)
+        else:
+            sql_query = 'SELECT ' + ','.join(columns) + ' FROM inst'
+            sql_query += ' WHERE cu=?'
+            sql_query += ' ORDER by inst_order'
+            dataframe = self.read_sql_query(sql_query, (int(cu_id),))
+        return self.decode(dataframe, ['color'])
 
+    def plot_timeline_all_cu(self):
         figures_vertical = []
 
         x_max = self.get_max("inst", "start + length")
-        for cu_id in sorted(cu_id['cu']):
-            sql_query = 'SELECT start,length,stall,color FROM inst'
-            sql_query += ' WHERE cu=' + str(cu_id)
-            sql_query += ' ORDER by inst_order'
-            dataframe = pd.read_sql_query(sql_query, self.__database)
+        for cu_id in self.get_cu_list():
+            dataframe = self.get_timeline_cu(cu_id)
             plot, plot_hist = self.plot_timeline_cu(
                 FIGURE_WIDTH, FIGURE_HEIGHT, dataframe, cu_id, x_max)
             figures_vertical.append([plot, plot_hist])
@@ -295,9 +358,9 @@ class TraceInstFigures(object):
 class TraceInstPlot(object):
     """docstring for TraceInstPlot"""
 
-    def __init__(self, trace):
+    def __init__(self, trace, backend='sqlite'):
         self.__trace = trace.split('.')[0]
-        self.__figures = TraceInstFigures(trace)
+        self.__figures = TraceInstFigures(trace, backend)
 
     def draw(self):
         """ Draw pipeline """
@@ -316,12 +379,15 @@ def main():
         description='Multi2Sim simulation trace instruction analyzer')
     parser.add_argument('trace', nargs=1,
                         help='Multi2Sim trace files')
+    parser.add_argument("-b", "--backend",
+                        choices=['sqlite', 'columnar'], default='sqlite',
+                        help='Read columns from sqlite or the column store')
     args = parser.parse_args()
 
     trace = args.trace[0]
 
     # Plot timeline
-    pipeline = TraceInstPlot(trace)
+    pipeline = TraceInstPlot(trace, args.backend)
     pipeline.draw()
 
 
@@ -2,90 +2,40 @@
 """ Trace Instruction visualizer for Multi2Sim """
 
 import argparse
-import pandas as pd
 import numpy as np
+import pandas as pd
 from bokeh.charts import Histogram
 from bokeh.plotting import figure, show, output_file
 from bokeh.io import gridplot
 
 import tracemisc as tm
 import tracedatabase as td
+import tracestore as ts
 
 
 FIGURE_WIDTH = 1100
 FIGURE_HEIGHT = 450
 
+# Statistics of hop and residency lengths
+LENGTH_STATS = ['count', 'mean', 'median', 'max']
+
+
+def get_visit_starts(uid, module):
+    """ Get indexes of the hops where an access arrives at a module
+
+    uid and module are arrays of hops sorted by access and step, a visit is
+    a run of consecutive hops of one access at one module.
+    """
+    first = np.ones(len(uid), dtype=bool)
+    first[1:] = (uid[1:] != uid[:-1]) | (module[1:] != module[:-1])
+    return np.flatnonzero(first)
 
-class TraceMemFigures(object):
+
+class TraceMemFigures(ts.TraceStore):
     """docstring for TraceMemFigures"""
 
-    def __init__(self, trace_file):
-
-        self.__trace_file = trace_file
-
-        # Load database
-        self.__database = td.load_database(self.__trace_file)
-
-    def __build_database(self):
-        self.__database = td.load_database(self.__trace_file)
-
-    def get_column(self, table, column):
-        """ Get a column from database """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + column + ' FROM ' + table
-
-        return cursor.execute(sql_query)
-
-    def get_column_with_func_cond(self,
-                                  table, column,
-                                  func_name, conditions=''):
-        """ Get a column from database, apply with function """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + func_name
-        sql_query += '(' + column + ') FROM ' + table + ' '
-        sql_query += conditions
-        return cursor.execute(sql_query).fetchone()[0]
-
-    def get_max(self, table, column, conditions=''):
-        """ Get the maximum of a column from database """
-        return int(self.get_column_with_func_cond(table, column,
-                                                  'MAX', conditions))
-
-    def get_sum(self, table, column, conditions=''):
-        """ Get the sum of a column from database """
-        return int(self.get_column_with_func_cond(table, column,
-                                                  'SUM', conditions))
-
-    def get_count(self, table, column, conditions=''):
-        """ Get the count of a column from database """
-        return int(self.get_column_with_func_cond(table, column,
-                                                  'COUNT', conditions))
-
-    def get_column_list(self, table):
-        """Get all columns as a list"""
-        cursor = self.__database.cursor()
-        sql_query = "PRAGMA table_info(" + table + ")"
-        column_list = []
-        metadata = cursor.execute(sql_query)
-        for item in metadata:
-            if item[1] != 'cycle':
-                column_list.append(item[1])
-        return sorted(column_list)
-
-    def get_table_list(self):
-        """Get all tables as a list"""
-        cursor = self.__database.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        table_list = []
-        for item in cursor.fetchall():
-            table_list.append(item[0])
-        return sorted(table_list)
+    def __init__(self, trace_file, backend='sqlite'):
+        super(TraceMemFigures, self).__init__(trace_file, backend)
 
     def plot_column(self, width, height,
                     dataframe, module, column,
@@ -139,19 +89,189 @@ class TraceMemFigures(object):
 
         return (plot, plot_hist)
 
-    def plot_modules(self):
-        # Get unique module
-        sql_query = 'SELECT DISTINCT module FROM mem_access'
-        modules = pd.read_sql_query(sql_query, self.__database)
+    def get_module_list(self):
+        """ Get unique module as a sorted list """
+        columns = self.get_column_store()
+        if columns is not None:
+            codes = np.unique(columns.get_column('mem_access', 'module'))
+            modules = pd.DataFrame({'module': codes})
+        else:
+            sql_query = 'SELECT DISTINCT module FROM mem_access'
+            modules = self.read_sql_query(sql_query)
+        return sorted(self.decode(modules, ['module'])['module'])
+
+    def get_length_module(self, module):
+        """ Get length of memory accesses of a module in uid order """
+        code = self.encode('module', module)
+        columns = self.get_column_store()
+        if columns is not None:
+            mask = columns.get_column('mem_access', 'module') == code
+            return columns.get_frame('mem_access', ['length'], mask)
+
+        sql_query = 'SELECT length FROM mem_access WHERE module=?'
+        sql_query += ' ORDER by uid'
+        return self.read_sql_query(sql_query, (code,))
+
+    def get_hops(self, columns):
+        """ Get columns of mem_hop in access and step order, as codes """
+        column_store = self.get_column_store()
+        if column_store is not None:
+            return column_store.get_frame('mem_hop', columns)
+
+        sql_query = 'SELECT ' + ','.join(columns) + ' FROM mem_hop'
+        sql_query += ' ORDER by uid, rowid'
+        return self.read_sql_query(sql_query)
+
+    def get_hop_length(self, module, action):
+        """ Get cycles spent in each hop doing action at module, eg.
+        ('l2-3', 'find_and_lock'), as an array """
+        module_code = self.encode('module', module)
+        action_code = self.encode('action', action)
+        column_store = self.get_column_store()
+        if column_store is not None:
+            mask = (column_store.get_column('mem_hop', 'module') ==
+                    module_code) & \
+                (column_store.get_column('mem_hop', 'action') == action_code)
+            lengths = column_store.get_column('mem_hop', 'length')[mask]
+            return lengths[~np.isnan(lengths)]
+
+        sql_query = 'SELECT length FROM mem_hop WHERE module=? AND action=?'
+        sql_query += ' AND length IS NOT NULL'
+        dataframe = self.read_sql_query(sql_query, (module_code, action_code))
+        return dataframe['length'].values
+
+    def get_hop_stats(self):
+        """ Get hop length statistics of every module and action """
+        hops = self.get_hops(['module', 'action', 'length']).dropna()
+        stats = hops.groupby(['module', 'action'])['length'].agg(
+            LENGTH_STATS).reset_index()
+        return self.decode(stats, ['module', 'action'])
+
+    def get_level_stats(self):
+        """ Get hop length statistics of every memory level and action,
+        hops at modules outside the hierarchy (eg. LDS) are left out """
+        levels = self.get_topology().get_levels()
+        code_levels = dict((code, levels.get(value)) for code, value in
+                           self.get_dictionary('module').iteritems())
+        hops = self.get_hops(['module', 'action', 'length']).dropna()
+        hops['level'] = hops['module'].map(code_levels)
+        stats = hops.dropna().groupby(['level', 'action'])['length'].agg(
+            LENGTH_STATS).reset_index()
+        stats['level'] = stats['level'].astype(np.int64)
+        return self.decode(stats, ['action'])
+
+    def get_residency(self):
+        """ Get visits of accesses to modules: uid, module, start and
+        length (cycles until the access moves on or ends) """
+        hops = self.get_hops(['uid', 'cycle', 'module', 'length'])
+        uid = hops['uid'].values
+        module = hops['module'].values
+        starts = get_visit_starts(uid, module)
+        if len(starts) == 0:
+            lengths = np.array([], dtype=np.float64)
+        else:
+            lengths = np.add.reduceat(
+                hops['length'].values.astype(np.float64), starts)
+
+        # Unfinished accesses have no length for their last hop
+        visits = pd.DataFrame({'uid': uid[starts],
+                               'module': module[starts],
+                               'start': hops['cycle'].values[starts],
+                               'length': lengths},
+                              columns=['uid', 'module', 'start', 'length'])
+        return self.decode(visits.dropna(), ['module'])
+
+    def get_residency_stats(self):
+        """ Get residency length statistics of every module """
+        visits = self.get_residency()
+        return visits.groupby('module')['length'].agg(
+            LENGTH_STATS).reset_index()
+
+    def get_cache_rows(self, table, columns, cache, order):
+        """ Get columns of a cache table for one cache, sorted by order,
+        rows of equal order stay in trace order """
+        code = self.encode('cache', cache)
+        column_store = self.get_column_store()
+        if column_store is not None:
+            mask = column_store.get_column(table, 'cache') == code
+            dataframe = column_store.get_frame(
+                table, sorted(set(columns) | set(order)), mask)
+            dataframe = dataframe.sort_values(order, kind='mergesort')
+            return dataframe[columns].reset_index(drop=True)
+
+        sql_query = 'SELECT ' + ','.join(columns) + ' FROM ' + table
+        sql_query += ' WHERE cache=? ORDER by ' + ', '.join(order)
+        sql_query += ', rowid'
+        return self.read_sql_query(sql_query, (code,))
+
+    def get_set_conflicts(self, cache):
+        """ Get block updates, distinct tags and replacements (a way
+        getting another tag) of every set of a cache """
+        blocks = self.get_cache_rows('cache_block',
+                                     ['set_index', 'way', 'cycle', 'tag'],
+                                     cache, ['set_index', 'way', 'cycle'])
+        set_index = blocks['set_index'].values
+        way = blocks['way'].values
+        tag = blocks['tag'].values
+
+        replaced = np.zeros(len(blocks), dtype=bool)
+        replaced[1:] = (set_index[1:] == set_index[:-1]) & \
+            (way[1:] == way[:-1]) & (tag[1:] != tag[:-1])
+        blocks['replacements'] = replaced.astype(np.int64)
+
+        groups = blocks.groupby('set_index')
+        conflicts = pd.DataFrame(
+            {'updates': groups.size(), 'tags': groups['tag'].nunique(),
+             'replacements': groups['replacements'].sum()},
+            columns=['updates', 'tags', 'replacements'])
+        return conflicts.reset_index()
+
+    def get_set_occupancy(self, cache):
+        """ Get accesses, ways used and cycles blocks were held by accesses
+        of every set of a cache """
+        accesses = self.get_cache_rows('cache_access',
+                                       ['set_index', 'way', 'length'],
+                                       cache, ['set_index', 'way', 'start'])
+        groups = accesses.groupby('set_index')
+        occupancy = pd.DataFrame({'accesses': groups.size(),
+                                  'ways': groups['way'].nunique(),
+                                  'cycles': groups['length'].sum()},
+                                 columns=['accesses', 'ways', 'cycles'])
+        return occupancy.reset_index()
+
+    def get_sharer_count(self, cache):
+        """ Get number of sharers of directory entries of a cache after every
+        change: cycle, set_index, way, sub_block and sharers """
+        columns = ['cycle', 'set_index', 'way', 'sub_block', 'action']
+        entries = self.get_cache_rows('cache_dir', columns, cache,
+                                      ['set_index', 'way', 'sub_block',
+                                       'cycle'])
+        action = entries['action'].values
+        delta = (action == self.encode('action', 'set_sharer')).astype(
+            np.int64) - (action == self.encode('action', 'clear_sharer'))
+        entries = entries[delta != 0]
+        delta = delta[delta != 0]
+
+        # Running sum of changes, restarted at every directory entry
+        same_entry = np.zeros(len(delta), dtype=bool)
+        same_entry[1:] = True
+        for column in ['set_index', 'way', 'sub_block']:
+            key = entries[column].values
+            same_entry[1:] &= key[1:] == key[:-1]
+        first = ~same_entry
+        total = np.cumsum(delta)
+        base = (total - delta)[first][np.cumsum(first) - 1]
+
+        sharers = entries[columns[:-1]].reset_index(drop=True)
+        sharers['sharers'] = total - base
+        return sharers
 
+    def plot_modules(self):
         figures_vertical = []
 
         x_max = self.get_max("mem_access", "length")
-        for module in sorted(modules['module']):
-            sql_query = 'SELECT length FROM mem_access WHERE module="' + \
-                str(module) + '"'
-            sql_query += ' ORDER by uid'
-            dataframe = pd.read_sql_query(sql_query, self.__database)
+        for module in self.get_module_list():
+            dataframe = self.get_length_module(module)
             plot, plot_hist = self.plot_column(FIGURE_WIDTH, FIGURE_HEIGHT,
                                                dataframe, module, 'length',
                                                x_max)
@@ -163,9 +283,9 @@ class TraceMemFigures(object):
 class TraceMemPlot(object):
     """docstring for TraceMemPlot"""
 
-    def __init__(self, trace):
+    def __init__(self, trace, backend='sqlite'):
         self.__trace = trace.split('.')[0]
-        self.__figures = TraceMemFigures(trace)
+        self.__figures = TraceMemFigures(trace, backend)
 
     def draw(self):
         """ Draw memory figures """
@@ -184,13 +304,39 @@ def main():
         description='Multi2Sim simulation trace memory analyzer')
     parser.add_argument('trace', nargs='+',
                         help='Multi2Sim trace files')
+    parser.add_argument("-b", "--backend",
+                        choices=['sqlite', 'columnar'], default='sqlite',
+                        help='Read columns from sqlite or the column store')
+    parser.add_argument("-s", "--stats", action='store_true',
+                        help='Print hop and residency lengths, do not plot')
+    parser.add_argument("-c", "--cache",
+                        help='Print conflicts and occupancy of every set '
+                        'of a cache, eg. vec-l1-cu00, do not plot')
     args = parser.parse_args()
 
     traces = args.trace
 
+    # Build missing databases in parallel
+    td.build_databases(traces)
+
+    if args.stats or args.cache:
+        for trace in traces:
+            figures = TraceMemFigures(trace, args.backend)
+            print trace
+            if args.stats:
+                print figures.get_hop_stats().to_string(index=False)
+                print figures.get_level_stats().to_string(index=False)
+                print figures.get_residency_stats().to_string(index=False)
+            if args.cache:
+                sets = pd.merge(figures.get_set_conflicts(args.cache),
+                                figures.get_set_occupancy(args.cache),
+                                how='outer', on='set_index')
+                print sets.to_string(index=False)
+        return
+
     # Plot memory
     for trace in traces:
-        memory = TraceMemPlot(trace)
+        memory = TraceMemPlot(trace, args.backend)
         memory.draw()
 
 
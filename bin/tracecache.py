@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+""" This module contains a query result cache shared by all visualizers """
+
+import collections
+import os
+import sys
+import pandas as pd
+
+# Upper bound of memory held by cached results
+CACHE_BYTES = 256 * 1024 * 1024
+
+
+def get_database_path(database):
+    """ Get file path of the main database of a connection """
+    for _, name, path in database.execute('PRAGMA database_list'):
+        if name == 'main':
+            return path
+    return ''
+
+
+def normalize_query(sql_query):
+    """ Normalize whitespace so equivalent queries share one entry """
+    return ' '.join(sql_query.split())
+
+
+def get_size(result):
+    """ Approximate memory held by a query result """
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    if isinstance(result, (list, tuple)):
+        return sys.getsizeof(result) + sum(
+            [sys.getsizeof(item) for item in result])
+    return sys.getsizeof(result)
+
+
+class QueryCache(object):
+    """ LRU cache of query results keyed by database path and query
+
+    An entry is dropped as soon as the mtime of its database file changes.
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.__max_bytes = max_bytes
+        self.__bytes = 0
+        self.__entries = collections.OrderedDict()
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def __get_mtime(self, path):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            # In-memory database or file gone, never trust the entry
+            return None
+        # Writes in WAL mode reach the database file only at checkpoints
+        if os.path.isfile(path + '-wal'):
+            mtime = max(mtime, os.path.getmtime(path + '-wal'))
+        return mtime
+
+    def __remove(self, key):
+        _, _, size = self.__entries.pop(key)
+        self.__bytes -= size
+
+    def get(self, database, sql_query, run_query, params=()):
+        """ Get result of a query, run_query(database, sql_query, params)
+        on miss """
+        path = get_database_path(database)
+        key = (path, normalize_query(sql_query), tuple(params))
+        mtime = self.__get_mtime(path)
+
+        if key in self.__entries:
+            result, entry_mtime, size = self.__entries.pop(key)
+            if mtime is not None and entry_mtime == mtime:
+                # Most recently used entries stay at the end
+                self.__entries[key] = (result, entry_mtime, size)
+                self.__hits += 1
+                return result
+            self.__bytes -= size
+
+        self.__misses += 1
+        result = run_query(database, sql_query, params)
+        size = get_size(result)
+        if mtime is not None and size <= self.__max_bytes:
+            self.__entries[key] = (result, mtime, size)
+            self.__bytes += size
+            while self.__bytes > self.__max_bytes:
+                self.__remove(next(iter(self.__entries)))
+                self.__evictions += 1
+        return result
+
+    def clear(self):
+        """ Drop all entries """
+        self.__entries.clear()
+        self.__bytes = 0
+
+    def get_stats(self):
+        """ Get hit/miss counters and memory held as a dict """
+        return {'hits': self.__hits,
+                'misses': self.__misses,
+                'evictions': self.__evictions,
+                'entries': len(self.__entries),
+                'bytes': self.__bytes}
+
+
+def __fetch_value(database, sql_query, params):
+    return database.execute(sql_query, params).fetchone()[0]
+
+
+def __fetch_frame(database, sql_query, params):
+    return pd.read_sql_query(sql_query, database, params=params)
+
+
+# One cache for every trace opened by the process
+QUERY_CACHE = QueryCache()
+
+
+def fetch_value(database, sql_query, params=()):
+    """ Get first column of first row of a query, cached """
+    return QUERY_CACHE.get(database, sql_query, __fetch_value, params)
+
+
+def read_sql_query(sql_query, database, params=()):
+    """ Same as pandas.read_sql_query, cached
+
+    Callers get a copy, so changing it never changes the cached frame.
+    """
+    return QUERY_CACHE.get(database, sql_query, __fetch_frame,
+                           params).copy()
+
+
+def get_stats():
+    """ Get counters of the shared cache """
+    return QUERY_CACHE.get_stats()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+""" This module contains a columnar cache of the trace database """
+
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# Rows of each table are stored in the order the visualizers read them
+SORT_KEYS = {'inst': 'inst_order',
+             'inst_stage': 'inst_rowid, start',
+             'wg_residency': 'cu, start',
+             'cycle_stage': 'cu, cycle',
+             'mem_access': 'uid',
+             'mem_hop': 'uid, rowid',
+             'cache_access': 'start, rowid',
+             'cache_block': 'cycle, rowid',
+             'cache_dir': 'cycle, rowid',
+             'memory': 'line'}
+
+
+def get_store_name(trace_name):
+    """ Get name of the column store built from a trace """
+    return os.path.splitext(trace_name)[0] + '.cols'
+
+
+def remove_store(store_name):
+    """ Remove a column store, if there is one """
+    if os.path.isdir(store_name):
+        shutil.rmtree(store_name)
+
+
+def __get_sort_key(table, columns):
+    if table in SORT_KEYS:
+        return SORT_KEYS[table]
+    elif 'cycle' in columns:
+        return 'cycle'
+    return None
+
+
+def __to_array(values, sql_type):
+    """ Convert a column fetched from sqlite to a typed numpy array """
+    if 'INT' in sql_type:
+        if None in values:
+            # Same as pandas: integer columns with NULL become float
+            return np.array([np.nan if value is None else value
+                             for value in values], dtype=np.float64)
+        return np.array(values, dtype=np.int64)
+    elif 'REAL' in sql_type or 'FLOA' in sql_type or 'DOUB' in sql_type:
+        return np.array([np.nan if value is None else value
+                         for value in values], dtype=np.float64)
+    return np.array(['' if value is None else str(value)
+                     for value in values])
+
+
+def build_store(database, store_name):
+    """ Export every table of a database to one .npy file per column """
+    building_name = store_name + '.tmp'
+    remove_store(building_name)
+    os.mkdir(building_name)
+
+    cursor = database.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    for table, in cursor.fetchall():
+        schema = [(item[1], item[2].upper()) for item in
+                  cursor.execute('PRAGMA table_info(' + table + ')')]
+        columns = [name for name, _ in schema]
+
+        sql_query = 'SELECT ' + ', '.join(columns) + ' FROM ' + table
+        sort_key = __get_sort_key(table, columns)
+        if sort_key is not None:
+            sql_query += ' ORDER by ' + sort_key
+        rows = cursor.execute(sql_query).fetchall()
+
+        table_dir = os.path.join(building_name, table)
+        os.mkdir(table_dir)
+        if rows:
+            values = zip(*rows)
+        else:
+            values = [[] for _ in columns]
+        for index, (column, sql_type) in enumerate(schema):
+            array = __to_array(list(values[index]), sql_type)
+            np.save(os.path.join(table_dir, column + '.npy'), array)
+
+    # Only a complete store is ever visible under its final name
+    os.rename(building_name, store_name)
+
+
+class ColumnStore(object):
+    """ Columnar cache, one directory per table and one file per column """
+
+    def __init__(self, store_name):
+        self.__store_name = store_name
+
+    def get_table_list(self):
+        """Get all tables as a list"""
+        return sorted(os.listdir(self.__store_name))
+
+    def get_column_list(self, table):
+        """Get all columns as a list"""
+        table_dir = os.path.join(self.__store_name, table)
+        return sorted([os.path.splitext(item)[0]
+                       for item in os.listdir(table_dir)])
+
+    def get_column(self, table, column):
+        """ Get a column as a read-only array mapped from disk """
+        path = os.path.join(self.__store_name, table, column + '.npy')
+        try:
+            return np.load(path, mmap_mode='r')
+        except ValueError:
+            # Empty columns cannot be mapped
+            return np.load(path)
+
+    def get_columns(self, table, columns, mask=None):
+        """ Get columns as a dict of arrays, optionally filtered by mask """
+        data = {}
+        for column in columns:
+            array = self.get_column(table, column)
+            data[column] = array if mask is None else array[mask]
+        return data
+
+    def get_frame(self, table, columns, mask=None):
+        """ Get columns as a dataframe, optionally filtered by mask """
+        return pd.DataFrame(self.get_columns(table, columns, mask),
+                            columns=columns)
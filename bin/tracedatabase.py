@@ -1,34 +1,556 @@
 #!/usr/bin/env python
 """ This module contains helper functions to build database """
 
-import gzip
+import argparse
+import errno
+import hashlib
+import mmap
+import multiprocessing
 import os
+import pickle
+import socket
 import sqlite3
-import re
+import time
+import tracetoken as tt
+import tracecolumn as tc
+import tracereader as tr
+import tracesummary as ts
+import traceinfo as ti
 from traceinfo import Instructions
 from traceinfo import MemoryAccess
-from traceinfo import CycleStatistics
+from traceinfo import CacheStates
+from traceinfo import WorkGroups
+from traceinfo import Topology
+
+# Each worker gets several chunks so that uneven chunks balance out
+CHUNKS_PER_PROCESS = 4
+
+# Seconds between two polls of a trace that is still being written
+FOLLOW_INTERVAL = 1.0
+
+# Polls a follower on another host may miss before it is taken for gone
+FOLLOW_MISSED_POLLS = 60
+
+# Bump when the parser writes different tables or rows for the same trace,
+# databases built by another version are rebuilt
+PARSER_VERSION = 9
+
+# Trace bytes parsed between two checkpoints of a build
+CHECKPOINT_BYTES = 64 * 1024 * 1024
+
+# Bytes hashed at both ends of a trace to tell traces apart
+HASH_BLOCK = 64 * 1024
+
+# Tables describing the build rather than the trace
+STATE_TABLES = ('metadata', 'manifest')
+
+# Source properties a database must match to be reused
+MANIFEST_KEYS = ('size', 'mtime', 'head_hash', 'tail_hash', 'parser_version')
+MANIFEST_SCHEMA = (('source', 'TEXT'), ('size', 'INTEGER'),
+                   ('mtime', 'REAL'), ('head_hash', 'TEXT'),
+                   ('tail_hash', 'TEXT'), ('parser_version', 'INTEGER'))
+
+
+def open_database(db_name):
+    """ Open database tuned for bulk ingest """
+    database = sqlite3.connect(db_name)
+    database.execute('PRAGMA journal_mode=WAL')
+    database.execute('PRAGMA synchronous=OFF')
+    return database
+
+
+def close_database(database):
+    """ Leave a self-contained database file """
+    try:
+        database.execute('PRAGMA journal_mode=DELETE')
+    except sqlite3.OperationalError:
+        # Readers of a followed trace still have it open, the last one to
+        # close it checkpoints the WAL file
+        pass
+    database.close()
+
+
+def remove_database(db_name):
+    """ Remove a database file along with its journal files """
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.isfile(db_name + suffix):
+            os.remove(db_name + suffix)
+
+
+def set_metadata(database, **values):
+    """ Record ingest state, eg. mode, complete, offset and clock """
+    with database:
+        database.execute('CREATE TABLE IF NOT EXISTS metadata '
+                         '(key TEXT PRIMARY KEY, value)')
+        database.executemany(
+            'INSERT OR REPLACE INTO metadata VALUES (?, ?)',
+            sorted(values.items()))
+
+
+def get_metadata(database):
+    """ Get ingest state as a dict, empty for databases without one """
+    cursor = database.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' "
+        "AND name='metadata'")
+    if cursor.fetchone() is None:
+        return {}
+    return dict(database.execute('SELECT key, value FROM metadata'))
+
+
+def get_source_manifest(trace_name):
+    """ Describe a trace file: path, size, mtime and hashes of both ends """
+    with open(trace_name, 'rb') as trace:
+        size = os.fstat(trace.fileno()).st_size
+        head_hash = hashlib.md5(trace.read(HASH_BLOCK)).hexdigest()
+        trace.seek(max(0, size - HASH_BLOCK))
+        tail_hash = hashlib.md5(trace.read(HASH_BLOCK)).hexdigest()
+    return {'source': os.path.abspath(trace_name),
+            'size': size,
+            'mtime': os.path.getmtime(trace_name),
+            'head_hash': head_hash,
+            'tail_hash': tail_hash,
+            'parser_version': PARSER_VERSION}
+
+
+def set_manifest(database, manifest):
+    """ Record which trace and parser version a database is built from """
+    columns = [name for name, _ in MANIFEST_SCHEMA]
+    definition = ', '.join([name + ' ' + sql_type
+                            for name, sql_type in MANIFEST_SCHEMA])
+    with database:
+        database.execute('DROP TABLE IF EXISTS manifest')
+        database.execute('CREATE TABLE manifest (' + definition + ')')
+        database.execute('INSERT INTO manifest VALUES (' +
+                         ', '.join(['?'] * len(columns)) + ')',
+                         [manifest[column] for column in columns])
+
+
+def get_manifest(database):
+    """ Get manifest as a dict, empty for databases without one """
+    cursor = database.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' "
+        "AND name='manifest'")
+    if cursor.fetchone() is None:
+        return {}
+    cursor = database.execute('SELECT * FROM manifest')
+    row = cursor.fetchone()
+    if row is None:
+        return {}
+    return dict(zip([item[0] for item in cursor.description], row))
+
+
+def is_manifest_current(manifest, trace_name):
+    """ Check if a manifest still describes a trace and this parser """
+    if not os.path.isfile(trace_name):
+        # Nothing to rebuild from, the database is all there is
+        return True
+    source_manifest = get_source_manifest(trace_name)
+    for key in MANIFEST_KEYS:
+        if manifest.get(key) != source_manifest[key]:
+            return False
+    return True
+
+
+def is_process_alive(pid):
+    """ Check if a process of this host is running """
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError as error:
+        # Running, as another user
+        return error.errno == errno.EPERM
+    return True
+
+
+def is_follower_alive(metadata):
+    """ Check if the follower of a database is still running
+
+    A follower on this host is checked by its pid, one on another host by
+    the time of its last poll.
+    """
+    if metadata.get('host') == socket.gethostname():
+        return is_process_alive(metadata.get('pid'))
+    timeout = FOLLOW_MISSED_POLLS * metadata.get('interval', FOLLOW_INTERVAL)
+    return time.time() - metadata.get('heartbeat', 0) < timeout
+
+
+def is_interrupted(database):
+    """ Check if a database was left behind by an interrupted build or by a
+    follower that is gone """
+    metadata = get_metadata(database)
+    if metadata.get('complete'):
+        return False
+    if metadata.get('mode') == 'follow':
+        return not is_follower_alive(metadata)
+    return metadata.get('mode') == 'build'
+
+
+def get_table_rowids(database):
+    """ Get last rowid of every trace table as a dict """
+    cursor = database.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' "
+        "AND name NOT LIKE 'sqlite_%'")
+    rowids = {}
+    for table, in cursor.fetchall():
+        if table not in STATE_TABLES:
+            rowids[table] = database.execute(
+                'SELECT MAX(rowid) FROM ' + table).fetchone()[0]
+    return rowids
+
+
+def rollback_tables(database, rowids):
+    """ Remove rows and tables written after rowids were taken """
+    current = get_table_rowids(database)
+    with database:
+        for table in current:
+            if table not in rowids:
+                database.execute('DROP TABLE ' + table)
+            elif rowids[table] is None:
+                database.execute('DELETE FROM ' + table)
+            else:
+                database.execute('DELETE FROM ' + table + ' WHERE rowid > ?',
+                                 (rowids[table],))
+
+
+def save_checkpoint(database, parser, offset, **values):
+    """ Commit finished records and save what it takes to resume at offset,
+    along with other metadata values
+
+    Tables are only appended to, so their last rowids tell which rows a
+    later resume has to throw away.
+    """
+    parser.flush_processed()
+    state = (get_table_rowids(database), parser.get_state())
+    set_metadata(database, offset=offset, clock=parser.get_cycle(),
+                 state=sqlite3.Binary(pickle.dumps(state, 2)), **values)
+
+
+def restore_checkpoint(database, parser, metadata):
+    """ Return tables and parser to the last checkpoint, return its offset """
+    rowids, state = pickle.loads(str(metadata['state']))
+    rollback_tables(database, rowids)
+    parser.set_state(state)
+    return metadata['offset']
+
+
+def get_checkpoint(db_name, mode, trace_name=None):
+    """ Get metadata of an unfinished database that can be resumed, None if
+    there is none. trace_name is checked against the manifest. """
+    if not os.path.isfile(db_name):
+        return None
+    database = sqlite3.connect(db_name)
+    try:
+        metadata = get_metadata(database)
+        manifest = get_manifest(database)
+    finally:
+        database.close()
+
+    if metadata.get('mode') != mode or metadata.get('complete') or \
+            metadata.get('state') is None:
+        return None
+    if trace_name is not None and \
+            not (manifest and is_manifest_current(manifest, trace_name)):
+        return None
+    return metadata
+
+
+def get_abandoned_checkpoint(db_name, trace_name):
+    """ Get metadata of a followed database whose follower is gone, None if
+    there is none or the trace no longer holds what was parsed """
+    checkpoint = get_checkpoint(db_name, 'follow')
+    if checkpoint is None or is_follower_alive(checkpoint) or \
+            checkpoint['offset'] > os.path.getsize(trace_name):
+        return None
+    return checkpoint
+
+
+def is_following(database):
+    """ Check if a database is still being appended to in follow mode """
+    metadata = get_metadata(database)
+    return metadata.get('mode') == 'follow' and not metadata.get('complete')
+
+
+class TraceParser(object):
+    """ Parse trace lines into the tables of a database """
+
+    def __init__(self, database, keep_orphans=False):
+        self.__cycle = 0
+        self.__instructions = Instructions(database)
+        self.__memory_access = MemoryAccess(database)
+        self.__work_groups = WorkGroups(database)
+        self.__cache_states = CacheStates(database)
+        self.__topology = Topology(database)
+
+        # Events of records created before the first line this parser sees
+        self.__orphans = [] if keep_orphans else None
+
+        # Event type -> handler, so every line is classified only once,
+        # and event type -> consumer of its records
+        self.__handlers = {tt.Clock: self.__parse_clock}
+        self.__consumers = {}
+        for event_types, consumer in (
+                (tt.INST_EVENTS, self.__instructions),
+                (tt.WG_EVENTS, self.__work_groups),
+                (tt.MEM_EVENTS, self.__memory_access),
+                (tt.CACHE_EVENTS, self.__cache_states),
+                (tt.TOPOLOGY_EVENTS, self.__topology)):
+            for event_type in event_types:
+                self.__handlers[event_type] = self.__parse_record
+                self.__consumers[event_type] = consumer
+
+    def __is_orphan(self, event):
+        """ Check if event belongs to a record this parser never created """
+        if self.__orphans is None or type(event) not in tt.UPDATE_EVENTS:
+            return False
+        if self.__consumers[type(event)].has_record(event.uid):
+            return False
+        self.__orphans.append((self.__cycle, event))
+        return True
+
+    def __parse_clock(self, event):
+        """ Parse clock info """
+        self.__cycle = event.clock
+
+    def __parse_record(self, event):
+        """ Parse instruction, work-group, memory, cache and topology info """
+        if not self.__is_orphan(event):
+            self.__consumers[type(event)].parse(self.__cycle, event)
+
+    def get_cycle(self):
+        """ Get clock of the last line parsed """
+        return self.__cycle
+
+    def get_settled_cycle(self):
+        """ Get first cycle instructions still in flight or still to be
+        parsed can be in, those before it are all written """
+        first_start = self.__instructions.get_first_start()
+        if first_start is None:
+            return self.__cycle
+        return min(first_start, self.__cycle)
+
+    def get_state(self):
+        """ Get records in flight, once flushed """
+        return (self.__cycle, self.__instructions.get_state(),
+                self.__memory_access.get_state(),
+                self.__work_groups.get_state(),
+                self.__cache_states.get_state())
+
+    def set_state(self, state):
+        """ Continue from a state saved by get_state """
+        (self.__cycle, inst_state, mem_state, wg_state,
+         cache_state) = state
+        self.__instructions.set_state(inst_state)
+        self.__memory_access.set_state(mem_state)
+        self.__work_groups.set_state(wg_state)
+        self.__cache_states.set_state(cache_state)
+
+    def parse(self, line):
+        """ Parse trace and save info to internal tables """
+        event = tt.tokenize(line)
+        if event is not None:
+            self.__handlers[type(event)](event)
+
+    def replay(self, orphans):
+        """ Apply orphan events of a later chunk to records in flight """
+        for cycle, event in orphans:
+            self.__consumers[type(event)].parse(cycle, event)
+
+    def get_orphans(self):
+        """ Get orphan events as a list of (cycle, event) """
+        return self.__orphans
+
+    def get_instruction_count(self):
+        """ Get number of instructions created by this parser """
+        return self.__instructions.get_instruction_count()
+
+    def pop_inflight(self):
+        """ Remove and return records still in flight """
+        return (self.__instructions.pop_processing(),
+                self.__memory_access.pop_processing(),
+                self.__work_groups.pop_processing(),
+                self.__cache_states.pop_processing())
+
+    def adopt_inflight(self, inflight, order_offset=0):
+        """ Continue records started by another parser """
+        (inst_processing, mem_processing, wg_processing,
+         cache_processing) = inflight
+        self.__instructions.adopt(inst_processing, order_offset)
+        self.__memory_access.adopt(mem_processing)
+        self.__work_groups.adopt(wg_processing)
+        self.__cache_states.adopt(cache_processing)
+
+    def flush_processed(self):
+        """ Write finished records, keep records still in flight """
+        self.__instructions.flush_processed()
+        self.__memory_access.flush_processed()
+        self.__work_groups.flush_processed()
+        self.__cache_states.flush_processed()
+        self.__topology.flush_processed()
+
+    def flush(self):
+        """ Write remaining data to database """
+        self.__instructions.flush()
+        self.__memory_access.flush()
+        self.__work_groups.flush()
+        self.__cache_states.flush()
+        self.__topology.flush()
+
+    def create_indexes(self):
+        """ Index tables once all rows are written """
+        self.__instructions.create_indexes()
+        self.__memory_access.create_indexes()
+        self.__work_groups.create_indexes()
+        self.__cache_states.create_indexes()
+
+    def finish(self, database):
+        """ Write remaining data, then index and summarize all tables """
+        self.flush()
+        self.create_indexes()
+        ti.build_cycle_stage(database, self.__cycle)
+        database.execute('ANALYZE')
+        ts.build_summary(database)
+
+
+def find_chunks(trace_name, count):
+    """ Split an uncompressed trace into byte ranges starting at clocks """
+    with open(trace_name, 'rb') as trace:
+        size = os.fstat(trace.fileno()).st_size
+        if size == 0:
+            return []
+        trace_map = mmap.mmap(trace.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            bounds = [0]
+            for index in range(1, count):
+                offset = trace_map.find('\nc clk=', size * index // count)
+                if offset == -1:
+                    break
+                if offset + 1 > bounds[-1]:
+                    bounds.append(offset + 1)
+            bounds.append(size)
+        finally:
+            trace_map.close()
+    return zip(bounds[:-1], bounds[1:])
+
+
+def get_chunk_database_name(trace_name, index):
+    """ Get name of the temporary database of a chunk """
+    return os.path.splitext(trace_name)[0] + '.part' + str(index) + '.db'
+
+
+def parse_chunk(args):
+    """ Parse byte range of a trace, run in a worker process """
+    trace_name, index, start, end = args
+    chunk_db_name = get_chunk_database_name(trace_name, index)
+    if os.path.isfile(chunk_db_name):
+        os.remove(chunk_db_name)
+
+    database = open_database(chunk_db_name)
+    parser = TraceParser(database, keep_orphans=True)
+    for batch in tr.iter_mapped_batches(trace_name, start, end):
+        for line in batch:
+            parser.parse(line)
+
+    # Records still in flight are finished by the chunks after this one
+    inflight = parser.pop_inflight()
+    parser.flush()
+    close_database(database)
+
+    return (chunk_db_name, parser.get_instruction_count(),
+            inflight, parser.get_orphans())
+
+
+def merge_chunk_database(database, chunk_db_name, order_offset):
+    """ Append all tables of a chunk database to the main database """
+    database.execute('ATTACH DATABASE ? AS chunk', (chunk_db_name,))
+    try:
+        with database:
+            tables = [table for table, in database.execute(
+                "SELECT name FROM chunk.sqlite_master WHERE type='table'")]
+
+            # Chunk rows are appended in rowid order after the main rows
+            rowid_offset = database.execute(
+                'SELECT MAX(rowid) FROM main.inst').fetchone()[0] or 0
+
+            # Codes are local to a chunk, values are added to the main
+            # dictionaries (the main parser created them all) first and
+            # rows are written with main codes
+            for table in tables:
+                if ti.is_dictionary_table(table):
+                    database.execute(
+                        'INSERT OR IGNORE INTO main.' + table + ' (value) '
+                        'SELECT value FROM chunk.' + table + ' ORDER by code')
+
+            for table in tables:
+                if ti.is_dictionary_table(table):
+                    continue
+                chunk_columns = database.execute(
+                    'PRAGMA chunk.table_info(' + table + ')').fetchall()
+
+                # Instruction order and rowid are local to a chunk
+                names = [column[1] for column in chunk_columns]
+                values = list(names)
+                if table == 'inst':
+                    values[names.index('inst_order')] = \
+                        'inst_order + ' + str(int(order_offset))
+                elif table == 'inst_stage':
+                    values[names.index('inst_rowid')] = \
+                        'inst_rowid + ' + str(int(rowid_offset))
+                for column in ti.ENCODED_COLUMNS.get(table, ()):
+                    dictionary = ti.get_dictionary_table(column)
+                    values[names.index(column)] = \
+                        '(SELECT main_dict.code FROM main.' + dictionary + \
+                        ' AS main_dict JOIN chunk.' + dictionary + \
+                        ' AS chunk_dict ON main_dict.value=chunk_dict.value' \
+                        ' WHERE chunk_dict.code=chunk_rows.' + column + ')'
+                database.execute(
+                    'INSERT INTO main.' + table + ' (' + ', '.join(names) +
+                    ') SELECT ' + ', '.join(values) + ' FROM chunk.' +
+                    table + ' AS chunk_rows ORDER by chunk_rows.rowid')
+    finally:
+        database.execute('DETACH DATABASE chunk')
+    os.remove(chunk_db_name)
 
 
 class DatabaseBuilder(object):
     """ Database builder for trace """
 
-    def __init__(self, trace_name):
+    def __init__(self, trace_name, processes=1):
         self.__trace_name = os.path.splitext(trace_name)[0]
-        self.__trace = None
 
-        self.__cycle = 0
-        self.__instructions = Instructions(self.__get_database_name())
-        self.__memory_access = MemoryAccess(self.__get_database_name())
-        self.__cycle_stats = CycleStatistics(self.__get_database_name())
-
-        if trace_name.endswith('.gz'):
-            with gzip.open(trace_name, 'rb') as trace_gz:
-                for line in trace_gz:
-                    self.__parse_trace(line)
+        # Resume an interrupted build of the same trace and parser version
+        # or the last poll of a follower that is gone, anything else left
+        # behind is started over
+        db_name = self.__get_database_name()
+        checkpoint = get_checkpoint(db_name, 'build', trace_name)
+        if checkpoint is None:
+            checkpoint = get_abandoned_checkpoint(db_name, trace_name)
+        if checkpoint is None:
+            remove_database(db_name)
+        # A column store exported from an older database is stale
+        tc.remove_store(tc.get_store_name(trace_name))
+        self.__database = open_database(db_name)
+        self.__parser = TraceParser(self.__database)
+
+        offset = 0
+        if checkpoint is None:
+            set_manifest(self.__database, get_source_manifest(trace_name))
+            set_metadata(self.__database, mode='build', complete=0,
+                         offset=0, clock=0)
+        else:
+            offset = restore_checkpoint(self.__database, self.__parser,
+                                        checkpoint)
+            if checkpoint['mode'] == 'follow':
+                # The rest of the trace is parsed as a build
+                set_manifest(self.__database, get_source_manifest(trace_name))
+                set_metadata(self.__database, mode='build')
+
+        if processes > 1 and offset == 0 and \
+                not tr.is_compressed(trace_name):
+            self.__parse_trace_parallel(trace_name, processes)
         else:
-            self.__trace_name = trace_name
-            self.__trace = open(trace_name, "r")
+            self.__parse_trace(trace_name, offset)
+        self.__close_db()
 
     def __get_name(self, suffix):
         return self.__trace_name + suffix
@@ -36,23 +558,50 @@ class DatabaseBuilder(object):
     def __get_database_name(self):
         return self.__get_name('.db')
 
-    def __parse_inst(self, cycle, line):
-        """ Parse instruction info """
-        if 'si.' in line:
-            stage, cu_id = self.__instructions.parse(cycle, line)
-            self.__cycle_stats.update(cycle, stage, cu_id)
+    def __close_db(self):
+        """ Flush and index all tables and close database """
+        self.__parser.finish(self.__database)
+        set_metadata(self.__database, complete=1, state=None,
+                     clock=self.__parser.get_cycle())
+        close_database(self.__database)
 
-    def __parse_mem(self, cycle, line):
-        """ Parse memory info """
-        if 'mem.' in line:
-            self.__memory_access.parse(cycle, line)
+    def __parse_trace(self, trace_name, offset):
+        """ Parse trace from offset, checkpoint every CHECKPOINT_BYTES """
+        # Compressed traces are decompressed ahead in a thread of their
+        # own, uncompressed ones are mapped
+        next_checkpoint = offset + CHECKPOINT_BYTES
+        parse = self.__parser.parse
+        for batch in tr.iter_batches(trace_name, offset):
+            for line in batch:
+                parse(line)
+            offset += tr.get_batch_size(batch)
+            if offset >= next_checkpoint:
+                save_checkpoint(self.__database, self.__parser, offset)
+                next_checkpoint = offset + CHECKPOINT_BYTES
 
-    def __parse_trace(self, line):
-        """ Parse trace and save info to internal tables """
-        if 'clk' in line:
-            self.__cycle = int(re.search(r'(\d+)', line).group(1))
-        self.__parse_inst(self.__cycle, line)
-        self.__parse_mem(self.__cycle, line)
+    def __parse_trace_parallel(self, trace_name, processes):
+        """ Parse chunks of trace in worker processes and merge them """
+        chunks = find_chunks(trace_name, processes * CHUNKS_PER_PROCESS)
+        tasks = [(trace_name, index, start, end)
+                 for index, (start, end) in enumerate(chunks)]
+
+        # Table definitions must exist before chunk tables are merged
+        self.__parser.flush()
+
+        order_offset = 0
+        pool = multiprocessing.Pool(processes)
+        try:
+            # Results come back in chunk order, merge while others parse
+            for result in pool.imap(parse_chunk, tasks):
+                chunk_db_name, inst_count, inflight, orphans = result
+                merge_chunk_database(self.__database, chunk_db_name,
+                                     order_offset)
+                self.__parser.replay(orphans)
+                self.__parser.adopt_inflight(inflight, order_offset)
+                order_offset += inst_count
+        finally:
+            pool.close()
+            pool.join()
 
     def run(self):
         """ Run parser and save to database """
@@ -60,11 +609,246 @@ class DatabaseBuilder(object):
             return sqlite3.connect(self.__get_database_name())
 
 
-def load_database(trace_name):
-    """ Load database """
-    trace_db_name = os.path.splitext(trace_name)[0] + '.db'
-    if os.path.isfile(trace_db_name):
-        return sqlite3.connect(trace_db_name)
+class TraceFollower(object):
+    """ Ingest a trace while the simulator is still writing it
+
+    Every poll parses the complete lines appended since the previous one
+    and commits finished records. Records still in flight stay in the
+    parser until a later poll finishes them.
+    """
+
+    def __init__(self, trace_name, interval=FOLLOW_INTERVAL):
+        if tr.is_compressed(trace_name):
+            raise ValueError('Only uncompressed traces can be followed')
+
+        self.__trace_name = trace_name
+        self.__offset = 0
+
+        # A follower that was stopped before finishing picks up from its
+        # last poll
+        db_name = get_database_name(trace_name)
+        checkpoint = get_checkpoint(db_name, 'follow')
+        if checkpoint is not None and \
+                checkpoint['offset'] > os.path.getsize(trace_name):
+            checkpoint = None
+        if checkpoint is None:
+            remove_database(db_name)
+        self.__database = open_database(db_name)
+        self.__parser = TraceParser(self.__database)
+
+        # cycle_stage holds the cycles before stage_cycle, the rest is
+        # counted from inst and inst_stage rows from these rowids on
+        self.__stage_cycle = 0
+        self.__stage_rowids = (0, 0)
+
+        if checkpoint is None:
+            set_metadata(self.__database, mode='follow', complete=0,
+                         offset=0, clock=0)
+        else:
+            self.__offset = restore_checkpoint(self.__database,
+                                               self.__parser, checkpoint)
+            self.__stage_cycle = checkpoint.get('stage_cycle', 0)
+            self.__stage_rowids = (checkpoint.get('stage_inst_rowid', 0),
+                                   checkpoint.get('stage_rowid', 0))
+        ti.create_table(self.__database, 'cycle_stage', ti.CYCLE_STAGE_SCHEMA)
+
+        # Tells readers whether the database is still being appended to
+        set_metadata(self.__database, pid=os.getpid(),
+                     host=socket.gethostname(), interval=interval,
+                     heartbeat=time.time())
+
+    def get_offset(self):
+        """ Get offset of the first byte not parsed yet """
+        return self.__offset
+
+    def poll(self):
+        """ Parse lines appended since the last poll, return their count """
+        size = os.path.getsize(self.__trace_name)
+        if size < self.__offset:
+            raise IOError(self.__trace_name + ' shrank while followed')
+
+        # A line still being written is left for the next poll
+        end = tr.find_line_end(self.__trace_name, self.__offset, size)
+        if end == self.__offset:
+            set_metadata(self.__database, heartbeat=time.time())
+            return 0
+
+        count = 0
+        parse = self.__parser.parse
+        for batch in tr.iter_mapped_batches(self.__trace_name,
+                                            self.__offset, end):
+            for line in batch:
+                parse(line)
+            count += len(batch)
+
+        self.__offset = end
+        self.__append_cycle_stage()
+        save_checkpoint(self.__database, self.__parser, end,
+                        heartbeat=time.time(),
+                        stage_cycle=self.__stage_cycle,
+                        stage_inst_rowid=self.__stage_rowids[0],
+                        stage_rowid=self.__stage_rowids[1])
+        return count
+
+    def __append_cycle_stage(self):
+        """ Count cycles no instruction in flight can be in any more """
+        self.__parser.flush_processed()
+        stop_cycle = max(self.__parser.get_settled_cycle(),
+                         self.__stage_cycle)
+        self.__stage_rowids = ti.append_cycle_stage(
+            self.__database, self.__stage_cycle, stop_cycle,
+            self.__stage_rowids)
+        self.__stage_cycle = stop_cycle
+
+    def finish(self):
+        """ Write records still in flight, index tables, close database """
+        self.poll()
+        self.__parser.finish(self.__database)
+        set_metadata(self.__database, complete=1, state=None)
+        close_database(self.__database)
+
+
+def follow_trace(trace_name, interval=FOLLOW_INTERVAL, idle_timeout=None):
+    """ Follow a trace until it stops growing for idle_timeout seconds
+
+    Without idle_timeout it is followed until interrupted with Ctrl-C.
+    """
+    follower = TraceFollower(trace_name, interval)
+    idle = 0.0
+    try:
+        while idle_timeout is None or idle < idle_timeout:
+            count = follower.poll()
+            if count:
+                idle = 0.0
+                print 'Parsed ' + str(count) + ' lines, offset ' + \
+                    str(follower.get_offset())
+            else:
+                time.sleep(interval)
+                idle += interval
+    except KeyboardInterrupt:
+        pass
+    follower.finish()
+
+
+def get_database_name(trace_name):
+    """ Get name of the database built from a trace """
+    return os.path.splitext(trace_name)[0] + '.db'
+
+
+def is_database_ready(trace_name):
+    """ Check if the database of a trace exists, is not a leftover of an
+    interrupted build or follower and was built from this trace by this
+    parser """
+    trace_db_name = get_database_name(trace_name)
+    if not os.path.isfile(trace_db_name):
+        return False
+    database = sqlite3.connect(trace_db_name)
+    try:
+        if is_interrupted(database):
+            return False
+        manifest = get_manifest(database)
+    finally:
+        database.close()
+
+    # Followed traces and databases built before manifests are trusted
+    return not manifest or is_manifest_current(manifest, trace_name)
+
+
+def load_database(trace_name, processes=1, backend='sqlite'):
+    """ Load database, uncompressed traces can be split over processes
+
+    backend='columnar' returns a tracecolumn.ColumnStore exported from the
+    database instead of a sqlite3 connection.
+    """
+    trace_db_name = get_database_name(trace_name)
+    if is_database_ready(trace_name):
+        database = sqlite3.connect(trace_db_name)
+        # Databases built before the summary table existed, a database
+        # still being followed gets one once it is complete
+        if not ts.has_summary(database) and not is_following(database):
+            ts.build_summary(database)
     else:
-        db_builder = DatabaseBuilder(trace_name)
-        return db_builder.run()
+        db_builder = DatabaseBuilder(trace_name, processes)
+        database = db_builder.run()
+
+    if backend == 'columnar':
+        try:
+            return get_column_store(database, trace_name)
+        finally:
+            database.close()
+
+    return database
+
+
+def get_column_store(database, trace_name):
+    """ Get the column store of a trace, exported from its database the
+    first time """
+    if is_following(database):
+        raise ValueError(get_database_name(trace_name) + ' is still being '
+                         'followed, read it with the sqlite backend')
+    store_name = tc.get_store_name(trace_name)
+    if not os.path.isdir(store_name):
+        tc.build_store(database, store_name)
+    return tc.ColumnStore(store_name)
+
+
+def build_database(trace_name):
+    """ Build database of a trace, run in a worker process """
+    print 'Parsing ' + trace_name
+    DatabaseBuilder(trace_name)
+    return trace_name
+
+
+def build_databases(trace_names, processes=None):
+    """ Build missing databases of several traces in parallel """
+    missing = []
+    for trace_name in trace_names:
+        if not is_database_ready(trace_name) and trace_name not in missing:
+            missing.append(trace_name)
+
+    if missing:
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(min(processes, len(missing)))
+        try:
+            done = pool.imap_unordered(build_database, missing)
+            for index, trace_name in enumerate(done):
+                print '[' + str(index + 1) + '/' + str(len(missing)) + \
+                    '] Built ' + get_database_name(trace_name)
+        finally:
+            pool.close()
+            pool.join()
+
+
+def load_databases(trace_names, processes=None):
+    """ Load databases of several traces, build missing ones in parallel """
+    build_databases(trace_names, processes)
+    return [load_database(trace_name) for trace_name in trace_names]
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Multi2Sim trace database builder')
+    parser.add_argument('trace', nargs='+',
+                        help='Multi2Sim trace files')
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help='Number of worker processes')
+    parser.add_argument("-f", "--follow", action='store_true',
+                        help='Keep ingesting a trace that is still written')
+    parser.add_argument("-i", "--interval", type=float,
+                        default=FOLLOW_INTERVAL,
+                        help='Seconds between two polls in follow mode')
+    parser.add_argument("-t", "--idle-timeout", type=float, default=None,
+                        help='Stop following after this many idle seconds')
+    args = parser.parse_args()
+
+    if args.follow:
+        for trace_name in args.trace:
+            follow_trace(trace_name, args.interval, args.idle_timeout)
+    else:
+        build_databases(args.trace, args.processes)
+
+
+if __name__ == '__main__':
+    main()
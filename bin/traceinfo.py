@@ -1,71 +1,583 @@
 #!/usr/bin/env python
 """ This module contains object describe a line in the trace """
 
-import re
-import sqlite3
-import traceregex as tr
+import array
+import numpy as np
+import tracetoken as tt
 import traceISA as isa
 
 DATA_THRESHOLD = 8192
 
+# uid is (cu << 32) | id, see tracetoken.inst_uid. inst_type packs the
+# traceISA.INST_* flags of the instruction, see traceISA.get_flags
+INST_SCHEMA = (('uid', 'INTEGER'), ('id', 'INTEGER'), ('start', 'INTEGER'),
+               ('length', 'INTEGER'), ('stall', 'INTEGER'),
+               ('fetch', 'INTEGER'), ('issue', 'INTEGER'),
+               ('active', 'INTEGER'), ('cu', 'INTEGER'), ('ib', 'INTEGER'),
+               ('wf', 'INTEGER'), ('wg', 'INTEGER'), ('uop_id', 'INTEGER'),
+               ('scalar_vector', 'INTEGER'), ('unit_action', 'INTEGER'),
+               ('asm', 'INTEGER'), ('inst_order', 'INTEGER'),
+               ('color', 'INTEGER'), ('inst_type', 'INTEGER'))
+
+# Stages of an instruction, one row per stretch of cycles in one stage.
+# inst_rowid is the rowid of the instruction in inst
+INST_STAGE_SCHEMA = (('inst_rowid', 'INTEGER'), ('stage', 'INTEGER'),
+                     ('start', 'INTEGER'), ('length', 'INTEGER'))
+
+MEM_ACCESS_SCHEMA = (('uid', 'INTEGER'), ('module', 'INTEGER'),
+                     ('type', 'INTEGER'), ('address', 'INTEGER'),
+                     ('start', 'INTEGER'), ('length', 'INTEGER'),
+                     ('miss', 'INTEGER'))
+
+# Steps of a memory access, one row per mem.new_access/mem.access. length
+# is the number of cycles until the next step or the end of the access
+MEM_HOP_SCHEMA = (('uid', 'INTEGER'), ('cycle', 'INTEGER'),
+                  ('module', 'INTEGER'), ('action', 'INTEGER'),
+                  ('length', 'INTEGER'))
+
+# Work-groups mapped to a cu, one row per si.map_wg and the matching
+# si.unmap_wg. length is NULL for work-groups never unmapped
+WG_RESIDENCY_SCHEMA = (('wg', 'INTEGER'), ('cu', 'INTEGER'),
+                       ('start', 'INTEGER'), ('length', 'INTEGER'),
+                       ('wi_first', 'INTEGER'), ('wi_count', 'INTEGER'),
+                       ('wf_first', 'INTEGER'), ('wf_count', 'INTEGER'))
+
+# Blocks held by accesses, one row per mem.new_access_block and the
+# matching mem.end_access_block, uid is the access
+CACHE_ACCESS_SCHEMA = (('uid', 'INTEGER'), ('cache', 'INTEGER'),
+                       ('set_index', 'INTEGER'), ('way', 'INTEGER'),
+                       ('start', 'INTEGER'), ('length', 'INTEGER'))
+
+# One row per mem.set_block
+CACHE_BLOCK_SCHEMA = (('cycle', 'INTEGER'), ('cache', 'INTEGER'),
+                      ('set_index', 'INTEGER'), ('way', 'INTEGER'),
+                      ('tag', 'INTEGER'), ('state', 'INTEGER'))
+
+# One row per mem.set_owner, mem.set_sharer and mem.clear_sharer, node is
+# the owner (-1 for none) or the sharer
+CACHE_DIR_SCHEMA = (('cycle', 'INTEGER'), ('cache', 'INTEGER'),
+                    ('set_index', 'INTEGER'), ('way', 'INTEGER'),
+                    ('sub_block', 'INTEGER'), ('action', 'INTEGER'),
+                    ('node', 'INTEGER'))
+
+# Stages of the Southern Islands pipeline, with '-' replaced by '_'
+CYCLE_STAGES = ('f', 'i', 's',
+                'bu_d', 'bu_r', 'bu_e', 'bu_w',
+                'su_d', 'su_r', 'su_e', 'su_m', 'su_w',
+                'simd_d', 'simd_e',
+                'mem_d', 'mem_r', 'mem_m', 'mem_w',
+                'lds_d', 'lds_r', 'lds_m', 'lds_w')
+
+# Instructions of a cu in each stage at each cycle, built from inst_stage
+# once ingest finishes, appended to while a trace is followed. end counts
+# instructions finishing at the cycle, other those in a stage not in
+# CYCLE_STAGES. Cycles with nothing in flight have no row
+CYCLE_STAGE_SCHEMA = ((('cycle', 'INTEGER'), ('cu', 'INTEGER')) +
+                      tuple((stage, 'INTEGER') for stage in CYCLE_STAGES) +
+                      (('end', 'INTEGER'), ('other', 'INTEGER')))
+
+# Cycles of cycle_stage counted at once
+CYCLE_BLOCK = 65536
+
+# Memory hierarchy, one row per mem.new_net and mem.new_mod of the trace
+# header. Names are those of the module and cache columns, a module with
+# no network above or below it has a NULL high_net or low_net
+MEM_NET_SCHEMA = (('name', 'TEXT'), ('num_nodes', 'INTEGER'))
+MEM_MODULE_SCHEMA = (('name', 'TEXT'), ('level', 'INTEGER'),
+                     ('num_sets', 'INTEGER'), ('assoc', 'INTEGER'),
+                     ('block_size', 'INTEGER'), ('sub_block_size', 'INTEGER'),
+                     ('num_sharers', 'INTEGER'), ('high_net', 'TEXT'),
+                     ('high_net_node', 'INTEGER'), ('low_net', 'TEXT'),
+                     ('low_net_node', 'INTEGER'))
+
+# Categorical columns hold integer codes, the values of column X are in
+# table dict_X, shared by every table with a column X
+DICTIONARY_PREFIX = 'dict_'
+DICTIONARY_SCHEMA = (('code', 'INTEGER PRIMARY KEY'), ('value', 'TEXT UNIQUE'))
+ENCODED_COLUMNS = {'inst': ('scalar_vector', 'unit_action', 'asm', 'color'),
+                   'inst_stage': ('stage',),
+                   'mem_access': ('module', 'type'),
+                   'mem_hop': ('module', 'action'),
+                   'cache_access': ('cache',),
+                   'cache_block': ('cache', 'state'),
+                   'cache_dir': ('cache', 'action')}
+
+# Indexes created once ingest finishes, (name, table, columns)
+INST_INDEXES = (
+    # WHERE cu=N ORDER by inst_order, covering the timeline columns
+    ('inst_cu_order', 'inst',
+     ('cu', 'inst_order', 'start', 'length', 'stall', 'color')),
+    # WHERE cu=N AND unit_action ...
+    ('inst_unit_action_cu', 'inst', ('unit_action', 'cu')),
+    # JOIN inst ON inst.rowid=inst_rowid, covering stage and length
+    ('inst_stage_rowid', 'inst_stage', ('inst_rowid', 'stage', 'length')))
+
+WG_RESIDENCY_INDEXES = (
+    # WHERE cu=N AND start <= C, covering the interval and the work-group
+    ('wg_residency_cu_start', 'wg_residency', ('cu', 'start', 'length', 'wg')),
+    # JOIN inst ON inst.wg=wg_residency.wg AND inst.cu=wg_residency.cu
+    ('wg_residency_wg', 'wg_residency', ('wg', 'cu', 'start')))
+
+CYCLE_STAGE_INDEXES = (
+    # WHERE cu=N ORDER by cycle
+    ('cycle_stage_cu_cycle', 'cycle_stage', ('cu', 'cycle')),)
+
+MEM_ACCESS_INDEXES = (
+    # WHERE module=... ORDER by uid, covering length
+    ('mem_access_module_uid', 'mem_access', ('module', 'uid', 'length')),
+    ('mem_access_type_module', 'mem_access', ('type', 'module')),
+    # WHERE module=... AND action=..., covering length
+    ('mem_hop_module_action', 'mem_hop', ('module', 'action', 'length')),
+    ('mem_hop_uid', 'mem_hop', ('uid', 'cycle')))
+
+# Every query of these tables picks one cache, then sets and ways in time
+CACHE_INDEXES = (
+    ('cache_access_block', 'cache_access',
+     ('cache', 'set_index', 'way', 'start')),
+    ('cache_block_block', 'cache_block',
+     ('cache', 'set_index', 'way', 'cycle')),
+    ('cache_dir_block', 'cache_dir',
+     ('cache', 'set_index', 'way', 'cycle')))
+
+
+def create_table(database, table, schema):
+    """Create table from a sequence of (column, type) pairs"""
+    columns = ', '.join([name + ' ' + sql_type for name, sql_type in schema])
+    query = 'CREATE TABLE IF NOT EXISTS ' + table + ' (' + columns + ')'
+    with database:
+        database.execute(query)
+
+
+def create_indexes(database, indexes):
+    """Create indexes from a sequence of (name, table, columns)"""
+    with database:
+        for name, table, columns in indexes:
+            database.execute('CREATE INDEX IF NOT EXISTS ' + name + ' ON ' +
+                             table + ' (' + ', '.join(columns) + ')')
+
+
+def get_dictionary_table(column):
+    """Get name of the table holding the values of a categorical column"""
+    return DICTIONARY_PREFIX + column
+
+
+def is_dictionary_table(table):
+    """Check if a table holds the values of a categorical column"""
+    return table.startswith(DICTIONARY_PREFIX)
+
+
+class Dictionary(object):
+    """Integer codes of the values of a categorical column"""
+
+    def __init__(self, database, column):
+        self.__database = database
+        self.__table = get_dictionary_table(column)
+        self.__codes = {None: None}
+        create_table(database, self.__table, DICTIONARY_SCHEMA)
+
+    def encode(self, value):
+        """Get code of a value, adding the value on first use"""
+        if value in self.__codes:
+            return self.__codes[value]
+
+        # Another parser may have merged the value in already
+        with self.__database:
+            self.__database.execute('INSERT OR IGNORE INTO ' + self.__table +
+                                    ' (value) VALUES (?)', (value,))
+        code = self.__database.execute(
+            'SELECT code FROM ' + self.__table + ' WHERE value=?',
+            (value,)).fetchone()[0]
+        self.__codes[value] = code
+        return code
+
+    def get_codes(self, values):
+        """Get codes of all values as a dict keyed by value"""
+        for value in set(values):
+            if value not in self.__codes:
+                self.encode(value)
+        return self.__codes
+
+
+def get_dictionaries(database, table):
+    """Get a Dictionary for every categorical column of a table"""
+    return dict([(column, Dictionary(database, column))
+                 for column in ENCODED_COLUMNS.get(table, ())])
+
+
+class TableWriter(object):
+    """Bulk writer with a fixed column order for one table
+
+    Columns with a Dictionary in dictionaries are written as codes.
+    """
+
+    def __init__(self, database, table, columns, dictionaries=None):
+        self.__database = database
+        self.__columns = tuple(columns)
+        if dictionaries is None:
+            dictionaries = {}
+        self.__dictionaries = [(index, dictionaries[column])
+                               for index, column in enumerate(self.__columns)
+                               if column in dictionaries]
+        self.__query = 'INSERT INTO %s (%s) VALUES (%s)' % (
+            table, ', '.join(self.__columns),
+            ', '.join(['?'] * len(self.__columns)))
+
+    def get_columns(self):
+        """Get column order of the prepared statement"""
+        return self.__columns
+
+    def get_database(self):
+        """Get database written to"""
+        return self.__database
+
+    def write(self, records):
+        """Write records (dicts) with one executemany in one transaction"""
+        columns = self.__columns
+        self.write_rows([[record.get(column) for column in columns]
+                         for record in records])
+
+    def write_rows(self, rows):
+        """Write rows (lists in column order) with one executemany in one
+        transaction, categorical values are replaced by codes in place"""
+        for index, dictionary in self.__dictionaries:
+            codes = dictionary.get_codes([row[index] for row in rows])
+            for row in rows:
+                row[index] = codes[row[index]]
+        with self.__database:
+            self.__database.executemany(self.__query, rows)
+
+
+# Stage name <-> small integer, so stage transitions are arrays of ints
+STAGE_CODES = {}
+STAGE_NAMES = []
+
+
+def get_stage_code(stage):
+    """Get integer code of a stage name, registering new names"""
+    try:
+        return STAGE_CODES[stage]
+    except KeyError:
+        STAGE_CODES[stage] = len(STAGE_NAMES)
+        STAGE_NAMES.append(stage)
+        return STAGE_CODES[stage]
+
+
+def get_stage_columns(database):
+    """Get column of cycle_stage counting each code of dict_stage, as an
+    array indexed by code"""
+    names = [name for name, _ in CYCLE_STAGE_SCHEMA]
+    codes = dict(database.execute(
+        'SELECT code, value FROM ' + get_dictionary_table('stage')))
+    columns = np.empty(max(codes.keys() + [0]) + 1, dtype=np.int64)
+    columns.fill(names.index('other'))
+    for code, value in codes.iteritems():
+        stage = value.replace('-', '_')
+        if stage in CYCLE_STAGES:
+            columns[code] = names.index(stage)
+    return columns
+
+
+def __write_cycle_stage_cu(writer, cu_id, stretches, ends, bounds=None):
+    """Count stretches (column, start, stop) and instruction ends of a cu
+    at every cycle and write the cycles with anything in flight, only
+    those from bounds[0] to bounds[1] - 1 if given"""
+    width = len(CYCLE_STAGE_SCHEMA)
+    columns, starts, stops = stretches
+
+    # Counts only change where a stretch starts or stops: one step of the
+    # difference array per change, summed up into the counts from then on
+    changes = np.unique(np.concatenate((starts, stops)))
+    steps = np.zeros((len(changes), width), dtype=np.int64)
+    np.add.at(steps, (np.searchsorted(changes, starts), columns), 1)
+    np.add.at(steps, (np.searchsorted(changes, stops), columns), -1)
+    counts = np.cumsum(steps, axis=0)
+
+    first = min(changes[0], ends.min()) if len(ends) else changes[0]
+    last = max(changes[-1], ends.max()) if len(ends) else changes[-1]
+    if bounds is not None:
+        first = max(first, bounds[0])
+        last = min(last, bounds[1] - 1)
+    end_column = [name for name, _ in CYCLE_STAGE_SCHEMA].index('end')
+    for block_start in xrange(first, last + 1, CYCLE_BLOCK):
+        cycles = np.arange(block_start, min(block_start + CYCLE_BLOCK,
+                                            last + 1))
+        change = np.searchsorted(changes, cycles, side='right') - 1
+        rows = counts[np.maximum(change, 0)]
+        rows[change < 0] = 0
+        block_ends = ends[(ends >= cycles[0]) & (ends <= cycles[-1])]
+        np.add.at(rows[:, end_column], block_ends - cycles[0], 1)
+        rows[:, 0] = cycles
+        rows[:, 1] = cu_id
+        rows = rows[rows[:, 2:].any(axis=1)]
+        if len(rows):
+            writer.write_rows(rows.tolist())
+
+
+def build_cycle_stage(database, last_cycle):
+    """Build the cycle_stage table from inst_stage, once inst and
+    inst_stage are complete and indexed. Stages of instructions never
+    finished last until last_cycle"""
+    with database:
+        database.execute('DROP TABLE IF EXISTS cycle_stage')
+    create_table(database, 'cycle_stage', CYCLE_STAGE_SCHEMA)
+    writer = TableWriter(database, 'cycle_stage',
+                         [name for name, _ in CYCLE_STAGE_SCHEMA])
+    stage_columns = get_stage_columns(database)
+
+    cu_list = [cu_id for cu_id, in database.execute(
+        'SELECT DISTINCT cu FROM inst ORDER by cu')]
+    for cu_id in cu_list:
+        rows = database.execute(
+            'SELECT inst_stage.stage, inst_stage.start, '
+            'inst_stage.start + IFNULL(inst_stage.length, ? - '
+            'inst_stage.start) FROM inst JOIN inst_stage '
+            'ON inst_stage.inst_rowid=inst.rowid WHERE inst.cu=?',
+            (last_cycle + 1, cu_id)).fetchall()
+        if not rows:
+            continue
+        stages, starts, stops = np.array(rows, dtype=np.int64).T
+        ends = np.array(database.execute(
+            'SELECT start + length FROM inst WHERE cu=? '
+            'AND length IS NOT NULL', (cu_id,)).fetchall(),
+                        dtype=np.int64).reshape(-1)
+        __write_cycle_stage_cu(writer, cu_id,
+                               (stage_columns[stages], starts, stops), ends)
+
+    create_indexes(database, CYCLE_STAGE_INDEXES)
+
+
+def append_cycle_stage(database, first_cycle, stop_cycle, first_rowids):
+    """Append the rows of cycles first_cycle to stop_cycle - 1 to
+    cycle_stage while a trace is followed, once no instruction still in
+    flight started before stop_cycle
+
+    Only instructions from inst rowid first_rowids[0] and their stages from
+    inst_stage rowid first_rowids[1] on are read, all instructions before
+    them end before first_cycle. Returns the rowids to read from next time.
+    """
+    inst_rowid, stage_rowid = first_rowids
+    insts = np.array(database.execute(
+        'SELECT rowid, cu, start + length FROM inst WHERE rowid >= ? '
+        'ORDER by rowid', (inst_rowid,)).fetchall(),
+                     dtype=np.int64).reshape(-1, 3)
+    stages = np.array(database.execute(
+        'SELECT rowid, inst_rowid, stage, start, start + length '
+        'FROM inst_stage WHERE rowid >= ? ORDER by rowid',
+        (stage_rowid,)).fetchall(), dtype=np.int64).reshape(-1, 5)
+
+    if stop_cycle > first_cycle and len(stages):
+        writer = TableWriter(database, 'cycle_stage',
+                             [name for name, _ in CYCLE_STAGE_SCHEMA])
+        stage_columns = get_stage_columns(database)
+        stage_cu = insts[np.searchsorted(insts[:, 0], stages[:, 1]), 1]
+        for cu_id in np.unique(insts[:, 1]):
+            mask = stage_cu == cu_id
+            if not mask.any():
+                continue
+            __write_cycle_stage_cu(
+                writer, int(cu_id),
+                (stage_columns[stages[mask, 2]], stages[mask, 3],
+                 stages[mask, 4]),
+                insts[insts[:, 1] == cu_id, 2], (first_cycle, stop_cycle))
+
+    # Instructions ending before stop_cycle count for no later cycle, rows
+    # are written in instruction order so their stages come first too
+    later = insts[:, 2] >= stop_cycle
+    if later.any():
+        inst_rowid = int(insts[later, 0].min())
+    elif len(insts):
+        inst_rowid = int(insts[-1, 0]) + 1
+    later = stages[:, 1] >= inst_rowid
+    if later.any():
+        stage_rowid = int(stages[later, 0].min())
+    elif len(stages):
+        stage_rowid = int(stages[-1, 0]) + 1
+    return inst_rowid, stage_rowid
+
+
+class InstRecord(object):
+    """An instruction in flight, serialized to a row once written"""
+
+    __slots__ = ('uid', 'id', 'cu', 'ib', 'wg', 'wf', 'uop_id', 'asm',
+                 'scalar_vector', 'unit_action', 'color', 'inst_type',
+                 'inst_order', 'start', 'end', 'stages')
+
+    def __init__(self, cycle, event, inst_order):
+        self.uid = event.uid
+        self.id = event.id
+        self.cu = event.cu
+        self.ib = event.ib
+        self.wg = event.wg
+        self.wf = event.wf
+        self.uop_id = event.uop_id
+        self.asm = event.asm
+        inst_info = isa.get_info(event.asm)
+        self.scalar_vector = inst_info[1]
+        self.unit_action = inst_info[2]
+        self.color = inst_info[3]
+        self.inst_type = isa.get_flags(isa.get_mnemonic(event.asm))
+        self.inst_order = inst_order
+        self.start = cycle
+        self.end = None
+
+        # Flat cycle, stage code, cycle, stage code, ...
+        self.stages = array.array('l', (cycle, get_stage_code(event.stage)))
+
+    def add_stage(self, cycle, stage):
+        """Record a stage transition"""
+        self.stages.append(cycle)
+        self.stages.append(get_stage_code(stage))
+
+    def get_transitions(self):
+        """Get stage transitions as a list of (cycle, stage name)"""
+        stages = self.stages
+        return [(stages[index], STAGE_NAMES[stages[index + 1]])
+                for index in xrange(0, len(stages), 2)]
+
+    def get_stretches(self):
+        """Get time spent in each stage as a list of (start, stage, length)
+
+        Consecutive cycles in the same stage count as one stretch. The last
+        stretch of an unfinished instruction has no length (None).
+        """
+        stretches = []
+        for cycle, stage in self.get_transitions():
+            if not stretches or stretches[-1][1] != stage:
+                stretches.append([cycle, stage, None])
+        for index in xrange(len(stretches) - 1):
+            stretches[index][2] = stretches[index + 1][0] - stretches[index][0]
+        if stretches and self.end is not None:
+            stretches[-1][2] = self.end - stretches[-1][0]
+        return [tuple(stretch) for stretch in stretches]
+
+    def to_dict(self):
+        """Get the row of the inst table as a dict"""
+        inst = {'uid': self.uid, 'id': self.id, 'cu': self.cu,
+                'ib': self.ib, 'wg': self.wg, 'wf': self.wf,
+                'uop_id': self.uop_id, 'asm': self.asm,
+                'scalar_vector': self.scalar_vector,
+                'unit_action': self.unit_action, 'color': self.color,
+                'inst_type': self.inst_type,
+                'inst_order': self.inst_order, 'start': self.start}
+        if self.end is None:
+            return inst
+
+        inst['length'] = self.end - self.start
+        count = {"fetch": 0, "stall": 0, "issue": 0, "active": 0}
+        for _, stage, length in self.get_stretches():
+            if stage == "f":
+                count['fetch'] += length
+            elif stage.startswith("s_"):
+                count['stall'] += length
+            elif stage == "i":
+                count['issue'] += length
+            else:
+                count['active'] += length
+        inst.update(count)
+        return inst
+
+    def get_stage_rows(self, inst_rowid):
+        """Get the rows of the inst_stage table, in INST_STAGE_SCHEMA order"""
+        return [[inst_rowid, stage, start, length]
+                for start, stage, length in self.get_stretches()]
+
+    def __getstate__(self):
+        # Stage codes are local to a process, pickle stage names instead
+        state = dict([(name, getattr(self, name)) for name in self.__slots__
+                      if name != 'stages'])
+        state['stages'] = self.get_transitions()
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.iteritems():
+            if name != 'stages':
+                setattr(self, name, value)
+        self.stages = array.array('l')
+        for cycle, stage in state['stages']:
+            self.add_stage(cycle, stage)
+
 
 class Instructions(object):
     """Instructions in trace"""
 
-    def __init__(self, db_name):
+    def __init__(self, database):
         self.__instruction_count = 1
 
         self.__processing = {}
         self.__processed = {}
 
-        self.__database = self.__create_db(db_name)
+        create_table(database, 'inst', INST_SCHEMA)
+        self.__writer = TableWriter(
+            database, 'inst', [name for name, _ in INST_SCHEMA],
+            get_dictionaries(database, 'inst'))
+        create_table(database, 'inst_stage', INST_STAGE_SCHEMA)
+        self.__stage_writer = TableWriter(
+            database, 'inst_stage', [name for name, _ in INST_STAGE_SCHEMA],
+            get_dictionaries(database, 'inst_stage'))
+
+    def __write_db(self, data_dict):
+        insts = data_dict.values()
 
-    def __del__(self):
-        # Write remaining data to database
+        # Rows are only appended, the n-th row written gets rowid last + n
+        last_rowid = self.__writer.get_database().execute(
+            'SELECT MAX(rowid) FROM inst').fetchone()[0] or 0
+        self.__writer.write([inst.to_dict() for inst in insts])
+
+        stages = []
+        for index, inst in enumerate(insts):
+            stages.extend(inst.get_stage_rows(last_rowid + index + 1))
+        self.__stage_writer.write_rows(stages)
+
+    def flush_processed(self):
+        """Write finished data to database, keep data still in flight"""
         if bool(self.__processed):
             self.__write_db(self.__processed)
+            self.__processed.clear()
+
+    def flush(self):
+        """Write remaining data to database"""
+        self.flush_processed()
         if bool(self.__processing):
             self.__write_db(self.__processing)
+            self.__processing.clear()
 
-        # Close database
-        self.__database.close()
+    def create_indexes(self):
+        """Index the inst and inst_stage tables, once all rows are written"""
+        create_indexes(self.__writer.get_database(), INST_INDEXES)
 
-    def __create_db(self, db_name):
-        database = sqlite3.connect(db_name)
-        cursor = database.cursor()
+    def has_record(self, uid):
+        """Check if an instruction is in flight"""
+        return uid in self.__processing
 
-        # Create inst table
-        sql_create_table = 'CREATE TABLE IF NOT EXISTS inst'
-        columns = ('uid TEXT, id INTEGER, start INTEGER, length INTEGER, '
-                   'stall INTEGER, fetch INTEGER, issue INTEGER, '
-                   'active INTEGER, cu INTEGER, ib INTEGER, wf INTEGER, '
-                   'wg INTEGER, uop_id INTEGER, scalar_vector TEXT, '
-                   'unit_action TEXT, life_full TEXT, life_lite TEXT, '
-                   'asm TEXT, inst_order INTEGER, color TEXT')
-        query = sql_create_table + '(' + columns + ')'
-        cursor.execute(query)
+    def get_instruction_count(self):
+        """Get number of instructions created so far"""
+        return self.__instruction_count - 1
 
-        # Save (commit) the changes
-        database.commit()
+    def pop_processing(self):
+        """Remove and return instructions still in flight"""
+        processing = self.__processing
+        self.__processing = {}
+        return processing
+
+    def get_first_start(self):
+        """Get start of the oldest instruction in flight, None if none"""
+        if not self.__processing:
+            return None
+        return min(inst.start for inst in self.__processing.itervalues())
 
-        return database
+    def get_state(self):
+        """Get instructions in flight and count, once flushed"""
+        return (self.__instruction_count, self.__processing)
 
-    def __write_db(self, data_dict):
-        database = self.__database
-        cursor = database.cursor()
-
-        # Insert data
-        for key in data_dict:
-            inst = data_dict[key]
-            columns = ', '.join(inst.keys())
-            placeholders = ':' + ', :'.join(inst.keys())
-            placeholders = placeholders.replace('-', '_')  # - to _
-            query = 'INSERT INTO inst (%s) VALUES (%s)' % (
-                columns, placeholders)
-            cursor.execute(query, inst)
-
-        # Save (commit) the changes
-        database.commit()
+    def set_state(self, state):
+        """Continue from a state saved by get_state"""
+        self.__instruction_count, self.__processing = state
+
+    def adopt(self, processing, order_offset=0):
+        """Continue instructions created by another parser"""
+        for uid, inst in processing.iteritems():
+            inst.inst_order += order_offset
+            self.__processing[uid] = inst
 
     def __get_inst_by_uid(self, uid):
         if uid in self.__processing:
@@ -73,70 +585,19 @@ class Instructions(object):
         else:
             return None
 
-    def __update_inst_exe(self, cycle, uid, line):
-        inst = self.__get_inst_by_uid(uid)
-        info = tr.parse_inst_exe(line).groupdict()
-        inst['life_full'] += str(cycle) + str(info['stage']) + ', '
-
-        return (info['stage'], info['cu'])
-
-    def __update_inst_new(self, cycle, uid, line):
-        self.__processing[uid] = {}
-        inst = self.__get_inst_by_uid(uid)
-        info = tr.parse_inst_new(line).groupdict()
+    def __update_inst_exe(self, cycle, event):
+        inst = self.__get_inst_by_uid(event.uid)
+        inst.add_stage(cycle, event.stage)
 
-        inst['uid'] = uid
-        inst['inst_order'] = self.__instruction_count
+    def __update_inst_new(self, cycle, event):
+        self.__processing[event.uid] = InstRecord(
+            cycle, event, self.__instruction_count)
         self.__instruction_count += 1
-        inst['start'] = cycle
-        inst['life_full'] = str(cycle) + str(info['stage']) + ', '
-        for key, value in info.iteritems():
-            if key != 'stage':
-                self.__processing[uid][key] = value
-        inst_info = isa.get_info(info['asm'])
-        inst['scalar_vector'] = inst_info[1]
-        inst['unit_action'] = inst_info[2]
-        inst['color'] = inst_info[3]
-        return (info['stage'], info['cu'])
-
-    def __update_inst_end(self, cycle, uid, line):
-        inst = self.__processing[uid]
-        info = tr.parse_inst_end(line).groupdict()
-        inst['length'] = int(cycle) - inst['start']
-        inst['life_full'] += str(cycle) + 'end'
-
-        # Get life lite
-        inst_life = re.findall(r'(\d+)(\w+(-\w+)*)', inst['life_full'])
-        inst_life_lite = []
-        index = 0
-        while index < len(inst_life) - 1:
-            curr_index = index
-            next_index = index + 1
-            curr_stage = inst_life[curr_index][1]
-            next_stage = inst_life[next_index][1]
-            while curr_stage == next_stage:
-                next_index += 1
-                next_stage = inst_life[next_index][1]
-            index = next_index
-            cycle = int(inst_life[next_index][0]) - \
-                int(inst_life[curr_index][0])
-            inst_life_lite.append((str(cycle), curr_stage))
 
-        count = {"fetch": 0, "stall": 0, "issue": 0, "active": 0}
-        inst_life_string = ""
-        for item in inst_life_lite:
-            inst_life_string += item[0] + " " + item[1] + ", "
-            if item[1] == "f":
-                count['fetch'] += int(item[0])
-            elif item[1].startswith("s_"):
-                count['stall'] += int(item[0])
-            elif item[1] == "i":
-                count['issue'] += int(item[0])
-            else:
-                count['active'] += int(item[0])
-        inst['life_lite'] = inst_life_string[:-2]
-        for key, value in count.iteritems():
-            self.__processing[uid][key] = value
+    def __update_inst_end(self, cycle, event):
+        uid = event.uid
+        inst = self.__processing[uid]
+        inst.end = cycle
 
         # Move to processed instructions
         self.__processed[uid] = self.__processing.pop(uid)
@@ -146,210 +607,166 @@ class Instructions(object):
             self.__write_db(self.__processed)
             self.__processed.clear()
 
-        return ('end', info['cu'])
-
-    def parse(self, cycle, line):
-        """Parse a line and return (stage, cu_id)"""
-        uid = str(tr.get_inst_uid(line))
-
+    def parse(self, cycle, event):
+        """Parse an instruction event"""
         # si.inst
-        if tr.parse_inst_exe(line) is not None:
-            return self.__update_inst_exe(cycle, uid, line)
+        if type(event) is tt.InstExe:
+            self.__update_inst_exe(cycle, event)
 
         # si.new_inst
-        elif tr.parse_inst_new(line) is not None:
-            return self.__update_inst_new(cycle, uid, line)
+        elif type(event) is tt.InstNew:
+            self.__update_inst_new(cycle, event)
 
         # si.end_inst
-        elif tr.parse_inst_end(line) is not None:
-            return self.__update_inst_end(cycle, uid, line)
-
-        return (None, None)
+        elif type(event) is tt.InstEnd:
+            self.__update_inst_end(cycle, event)
 
 
-class CycleStatistics(object):
-    """CycleStatistics contains several CycleStatisticsCU objects"""
+class WorkGroups(object):
+    """Work-groups mapped to compute units"""
 
-    def __init__(self, db_name):
-        self.__db_name = db_name
-        self.__cycle_stats = {}
+    def __init__(self, database):
+        # Work-groups mapped right now, rows of wg_residency without a length
+        self.__processing = {}
+        self.__processed = []
 
-    def update(self, cycle, stage, cu_id,):
-        """Update"""
-        if cu_id is None:
-            return
+        create_table(database, 'wg_residency', WG_RESIDENCY_SCHEMA)
+        self.__writer = TableWriter(
+            database, 'wg_residency',
+            [name for name, _ in WG_RESIDENCY_SCHEMA])
 
-        try:
-            self.__cycle_stats[cu_id].update(cycle, stage)
-        except KeyError:
-            self.__cycle_stats[cu_id] = CycleStatisticsCU(
-                cu_id, self.__db_name)
-            self.__cycle_stats[cu_id].update(cycle, stage)
+    def flush_processed(self):
+        """Write finished data to database, keep data still in flight"""
+        if bool(self.__processed):
+            self.__writer.write_rows(self.__processed)
+            self.__processed = []
 
+    def flush(self):
+        """Write remaining data to database"""
+        self.flush_processed()
+        if bool(self.__processing):
+            self.__writer.write_rows(self.__processing.values())
+            self.__processing.clear()
 
-class CycleStatisticsCU(object):
-    """CycleStatisticsCU contains stats of each cycle for each compute unit"""
+    def create_indexes(self):
+        """Index the wg_residency table, once all rows are written"""
+        create_indexes(self.__writer.get_database(), WG_RESIDENCY_INDEXES)
 
-    def __init__(self, cu_id, db_name):
-        self.__cu_id = cu_id
-        self.__cycle = 1
+    def has_record(self, uid):
+        """Check if a work-group is mapped"""
+        return uid in self.__processing
 
+    def pop_processing(self):
+        """Remove and return work-groups still mapped"""
+        processing = self.__processing
         self.__processing = {}
-        self.__processed = {}
-        self.__stages = {}
-        self.__database = self.__create_db(db_name)
-
-    def __del__(self):
-        # Write remaining data to database
-        if bool(self.__processed):
-            self.__write_db(self.__processed)
-        if bool(self.__processing):
-            self.__write_db(self.__processing)
+        return processing
 
-        # Close database
-        self.__database.close()
+    def get_state(self):
+        """Get work-groups still mapped, once flushed"""
+        return self.__processing
 
-    def __get_column_list(self, table):
-        """Get all columns as a list"""
-        cursor = self.__database.cursor()
-        sql_query = "PRAGMA table_info(" + table + ")"
-        column_list = []
-        metadata = cursor.execute(sql_query)
-        for item in metadata:
-            if item[1] != 'cycle':
-                column_list.append(item[1])
-        return sorted(column_list)
+    def set_state(self, state):
+        """Continue from a state saved by get_state"""
+        self.__processing = state
 
-    def __create_db(self, db_name):
-        database = sqlite3.connect(db_name)
-        cursor = database.cursor()
+    def adopt(self, processing):
+        """Continue work-groups mapped in another parser"""
+        self.__processing.update(processing)
 
-        # Create an empty table
-        table_name = 'cycle_cu_' + str(self.__cu_id)
-        query = 'CREATE TABLE IF NOT EXISTS ' + table_name + ' (cycle INTEGER)'
-        cursor.execute(query)
+    def parse(self, cycle, event):
+        """Parse a work-group event"""
+        # si.map_wg
+        if type(event) is tt.WgMap:
+            self.__processing[event.uid] = [
+                event.wg, event.cu, cycle, None, event.wi_first,
+                event.wi_count, event.wf_first, event.wf_count]
 
-        # Save (commit) the changes
-        database.commit()
-
-        return database
-
-    def __write_db(self, data_dict):
-        database = self.__database
-        cursor = database.cursor()
-
-        table_name = 'cycle_cu_' + str(self.__cu_id)
-
-        # Check if column exists in table
-        database_columns = sorted(self.__get_column_list(table_name))
-        datadict_columns = sorted(self.__stages.keys())
-        diff_columns = set(datadict_columns) - set(database_columns)
-
-        # Add columns to database if necessary
-        if diff_columns is not None:
-            for column in sorted(list(diff_columns)):
-                query = 'ALTER TABLE ' + table_name + ' ADD COLUMN ' + \
-                    column.replace('-', '_') + ' INTEGER'
-                cursor.execute(query)
-            database.commit()
-
-        # Insert data
-        for key in data_dict:
-            data = data_dict[key]
-            columns = ', '.join(data.keys())
-            placeholders = ':' + ', :'.join(data.keys())
-            placeholders = placeholders.replace('-', '_')  # - to _
-            query = 'INSERT INTO ' + table_name + ' (%s) VALUES (%s)' % (
-                columns, placeholders)
-            cursor.execute(query, data)
-
-        # Save (commit) the changes
-        database.commit()
-
-    def update(self, cycle, stage):
-        """ Update cycle statistics"""
-        if stage is not None:
-            stage = stage.replace('-', '_')
-            self.__stages[stage] = 1
-
-            # Update cycle info dictionary
-            try:
-                cycle_dict = self.__processing[cycle]
-                try:
-                    cycle_dict[stage] += 1
-                except KeyError:
-                    cycle_dict[stage] = 1
-            except KeyError:
-                self.__processing[cycle] = {}
-                self.__processing[cycle]['cycle'] = cycle
-                self.__processing[cycle][stage] = 1
-
-            if cycle != self.__cycle:
-                cycle_info = self.__processing.pop(self.__cycle)
-                self.__processed[self.__cycle] = cycle_info
-                self.__cycle = cycle
-
-            if len(self.__processed) > DATA_THRESHOLD:
-                self.__write_db(self.__processed)
-                self.__processed.clear()
+        # si.unmap_wg
+        elif type(event) is tt.WgUnmap:
+            row = self.__processing.pop(event.uid)
+            row[3] = cycle - row[2]
+            self.__processed.append(row)
 
 
 class MemoryAccess(object):
     """Memory access information"""
 
-    def __init__(self, db_name):
+    def __init__(self, database):
         self.__processing = {}
         self.__processed = {}
 
-        self.__database = self.__create_db(db_name)
+        create_table(database, 'mem_access', MEM_ACCESS_SCHEMA)
+        self.__writer = TableWriter(
+            database, 'mem_access', [name for name, _ in MEM_ACCESS_SCHEMA],
+            get_dictionaries(database, 'mem_access'))
+        create_table(database, 'mem_hop', MEM_HOP_SCHEMA)
+        self.__hop_writer = TableWriter(
+            database, 'mem_hop', [name for name, _ in MEM_HOP_SCHEMA],
+            get_dictionaries(database, 'mem_hop'))
+
+    def __get_hop_rows(self, mem_access):
+        """Get the rows of the mem_hop table, in MEM_HOP_SCHEMA order"""
+        uid = mem_access['uid']
+        hops = mem_access['hops']
+        rows = [[uid, cycle, module, action, None]
+                for cycle, module, action in hops]
+        for index in xrange(len(rows) - 1):
+            rows[index][4] = rows[index + 1][1] - rows[index][1]
+        if 'length' in mem_access:
+            end = mem_access['start'] + mem_access['length']
+            rows[-1][4] = end - rows[-1][1]
+        return rows
 
-    def __del__(self):
-        # Write remaining data to database
+    def __write_db(self, data_dict):
+        self.__writer.write(data_dict.itervalues())
+        hops = []
+        for mem_access in data_dict.itervalues():
+            hops.extend(self.__get_hop_rows(mem_access))
+        self.__hop_writer.write_rows(hops)
+
+    def flush_processed(self):
+        """Write finished data to database, keep data still in flight"""
         if bool(self.__processed):
             self.__write_db(self.__processed)
+            self.__processed.clear()
+
+    def flush(self):
+        """Write remaining data to database"""
+        self.flush_processed()
         if bool(self.__processing):
             self.__write_db(self.__processing)
+            self.__processing.clear()
 
-        # Close database
-        self.__database.close()
-
-    def __create_db(self, db_name):
-        database = sqlite3.connect(db_name)
-        cursor = database.cursor()
+    def create_indexes(self):
+        """Index the mem_access and mem_hop tables, once all rows are
+        written"""
+        create_indexes(self.__writer.get_database(), MEM_ACCESS_INDEXES)
 
-        # Create inst table
-        sql_create_table = 'CREATE TABLE IF NOT EXISTS mem_access'
-        columns = ('uid INTEGER, module TEXT, type TEXT, address TEXT, '
-                   'start INTEGER, length INTEGER, miss INTEGER, '
-                   'life_full TEXT')
-        columns = columns.replace('-', '_')  # - to _
-        query = sql_create_table + '(' + columns + ')'
-        cursor.execute(query)
+    def has_record(self, uid):
+        """Check if a memory access is in flight"""
+        return uid in self.__processing
 
-        # Save (commit) the changes
-        database.commit()
+    def pop_processing(self):
+        """Remove and return memory accesses still in flight"""
+        processing = self.__processing
+        self.__processing = {}
+        return processing
 
-        return database
+    def get_state(self):
+        """Get memory accesses in flight, once flushed"""
+        return self.__processing
 
-    def __write_db(self, data_dict):
-        database = self.__database
-        cursor = database.cursor()
+    def set_state(self, state):
+        """Continue from a state saved by get_state"""
+        self.__processing = state
 
-        # Insert data
-        for key in data_dict:
-            mem_access = data_dict[key]
-            columns = ', '.join(mem_access.keys())
-            placeholders = ':' + ', :'.join(mem_access.keys())
-            placeholders = placeholders.replace('-', '_')  # - to _
-            query = 'INSERT INTO mem_access' + ' (%s) VALUES (%s)' % (
-                columns, placeholders)
-            cursor.execute(query, mem_access)
+    def adopt(self, processing):
+        """Continue memory accesses created by another parser"""
+        self.__processing.update(processing)
 
-        # Save (commit) the changes
-        database.commit()
-
-    def __update_mem_new(self, cycle, uid, line):
-        info = tr.parse_mem_new(line).groupdict()
+    def __update_mem_new(self, cycle, event):
+        uid = event.uid
 
         # Create an entry in mem access
         self.__processing[uid] = {}
@@ -359,32 +776,24 @@ class MemoryAccess(object):
         mem_access['uid'] = uid
         mem_access['start'] = cycle
         mem_access['miss'] = 0
-        mem_access['module'] = info['module']
-        mem_access['type'] = info['type']
-        mem_access['address'] = info['addr']
-        mem_access['life_full'] = []
-        mem_access_life = str(cycle) + ' ' + \
-            info['module'] + ' ' + info['action']
-        mem_access['life_full'].append(mem_access_life)
-
-    def __update_mem_acc(self, cycle, uid, line):
-        info = tr.parse_mem_acc(line).groupdict()
-
+        mem_access['module'] = event.module
+        mem_access['type'] = event.type
+        mem_access['address'] = event.addr
+        # Few distinct modules and actions, share one string of each
+        mem_access['hops'] = [(cycle, intern(event.module),
+                               intern(event.action))]
+
+    def __update_mem_acc(self, cycle, event):
         # Update memory access view
-        mem_access = self.__processing[uid]
-        mem_access_life = str(cycle) + ' ' + \
-            info['module'] + ' ' + info['action']
-        if 'miss' in info['action']:
+        mem_access = self.__processing[event.uid]
+        if 'miss' in event.action:
             mem_access['miss'] += 1
-        mem_access['life_full'].append(mem_access_life)
+        mem_access['hops'].append((cycle, intern(event.module),
+                                   intern(event.action)))
 
     def __update_mem_end(self, cycle, uid):
         mem_access = self.__processing[uid]
         mem_access['length'] = cycle - int(mem_access['start'])
-        mem_access['life_full'].append(str(cycle) + ' end')
-
-        mem_access_life_full = ', '.join(mem_access['life_full'])
-        mem_access['life_full'] = mem_access_life_full
 
         # Move to processed instructions
         self.__processed[uid] = self.__processing.pop(uid)
@@ -394,18 +803,241 @@ class MemoryAccess(object):
             self.__write_db(self.__processed)
             self.__processed.clear()
 
-    def parse(self, cycle, line):
-        """Parse a line """
-
-        uid = tr.get_mem_uid(line)
+    def parse(self, cycle, event):
+        """Parse a memory access event"""
         # mem.access
-        if tr.parse_mem_acc(line) is not None:
-            self.__update_mem_acc(cycle, uid, line)
+        if type(event) is tt.MemAcc:
+            self.__update_mem_acc(cycle, event)
 
         # mem.new_access
-        elif tr.parse_mem_new(line) is not None:
-            self.__update_mem_new(cycle, uid, line)
+        elif type(event) is tt.MemNew:
+            self.__update_mem_new(cycle, event)
 
         # mem.end_access
-        elif tr.parse_mem_end(line) is not None:
-            self.__update_mem_end(cycle, uid)
+        elif type(event) is tt.MemEnd:
+            self.__update_mem_end(cycle, event.uid)
+
+
+class CacheStates(object):
+    """Blocks held by accesses, block states and directory entries"""
+
+    def __init__(self, database):
+        # Blocks held right now, rows of cache_access without a length
+        self.__processing = {}
+        self.__processed = []
+        self.__blocks = []
+        self.__entries = []
+
+        self.__writers = {}
+        for table, schema in (('cache_access', CACHE_ACCESS_SCHEMA),
+                              ('cache_block', CACHE_BLOCK_SCHEMA),
+                              ('cache_dir', CACHE_DIR_SCHEMA)):
+            create_table(database, table, schema)
+            self.__writers[table] = TableWriter(
+                database, table, [name for name, _ in schema],
+                get_dictionaries(database, table))
+
+    def flush_processed(self):
+        """Write finished data to database, keep data still in flight"""
+        for table, rows in (('cache_access', self.__processed),
+                            ('cache_block', self.__blocks),
+                            ('cache_dir', self.__entries)):
+            if bool(rows):
+                self.__writers[table].write_rows(rows)
+                del rows[:]
+
+    def flush(self):
+        """Write remaining data to database"""
+        self.flush_processed()
+        if bool(self.__processing):
+            self.__writers['cache_access'].write_rows(
+                self.__processing.values())
+            self.__processing.clear()
+
+    def create_indexes(self):
+        """Index the cache tables, once all rows are written"""
+        create_indexes(self.__writers['cache_access'].get_database(),
+                       CACHE_INDEXES)
+
+    def has_record(self, uid):
+        """Check if a block is held by an access"""
+        return uid in self.__processing
+
+    def pop_processing(self):
+        """Remove and return blocks still held"""
+        processing = self.__processing
+        self.__processing = {}
+        return processing
+
+    def get_state(self):
+        """Get blocks still held, once flushed"""
+        return self.__processing
+
+    def set_state(self, state):
+        """Continue from a state saved by get_state"""
+        self.__processing = state
+
+    def adopt(self, processing):
+        """Continue blocks held in another parser"""
+        self.__processing.update(processing)
+
+    def parse(self, cycle, event):
+        """Parse a cache or directory event"""
+        event_type = type(event)
+
+        # mem.new_access_block
+        if event_type is tt.BlockNew:
+            self.__processing[event.uid] = [
+                event.access, event.cache, event.set_index, event.way,
+                cycle, None]
+            return
+
+        # mem.end_access_block
+        if event_type is tt.BlockEnd:
+            row = self.__processing.pop(event.uid)
+            row[5] = cycle - row[4]
+            self.__processed.append(row)
+
+        # mem.set_block
+        elif event_type is tt.BlockSet:
+            self.__blocks.append([cycle, event.cache, event.set_index,
+                                  event.way, event.tag, event.state])
+
+        # mem.set_owner, mem.set_sharer, mem.clear_sharer
+        elif event_type is tt.DirSet:
+            self.__entries.append([cycle, event.cache, event.set_index,
+                                   event.way, event.sub_block, event.action,
+                                   event.node])
+
+        # Flush to database periodically
+        if len(self.__processed) + len(self.__blocks) + \
+                len(self.__entries) >= DATA_THRESHOLD:
+            self.flush_processed()
+
+
+class Topology(object):
+    """Networks and modules of the memory hierarchy"""
+
+    def __init__(self, database):
+        self.__nets = []
+        self.__modules = []
+
+        self.__writers = {}
+        for table, schema in (('mem_net', MEM_NET_SCHEMA),
+                              ('mem_module', MEM_MODULE_SCHEMA)):
+            create_table(database, table, schema)
+            self.__writers[table] = TableWriter(
+                database, table, [name for name, _ in schema])
+
+    def flush_processed(self):
+        """Write parsed networks and modules to database"""
+        for table, rows in (('mem_net', self.__nets),
+                            ('mem_module', self.__modules)):
+            if bool(rows):
+                self.__writers[table].write_rows(rows)
+                del rows[:]
+
+    def flush(self):
+        """Write remaining data to database"""
+        self.flush_processed()
+
+    def parse(self, cycle, event):
+        """Parse a network or module event of the trace header"""
+        # mem.new_net
+        if type(event) is tt.NetNew:
+            self.__nets.append([event.name, event.num_nodes])
+
+        # mem.new_mod
+        elif type(event) is tt.ModNew:
+            self.__modules.append([
+                event.name, event.level, event.num_sets, event.assoc,
+                event.block_size, event.sub_block_size, event.num_sharers,
+                event.high_net or None, event.high_net_node,
+                event.low_net or None, event.low_net_node])
+
+
+class TopologyGraph(object):
+    """Graph of the memory hierarchy, modules linked through networks
+
+    A module is above the modules on its low_net, its requests go down to
+    them. Level 1 is closest to the compute units.
+    """
+
+    def __init__(self, modules, nets):
+        # Module name -> dict of its mem_module row
+        self.__modules = dict((module['name'], module) for module in modules)
+        # Network name -> number of nodes
+        self.__nets = dict(nets)
+
+        self.__lower = dict((name, []) for name in self.__modules)
+        self.__upper = dict((name, []) for name in self.__modules)
+        for name, module in sorted(self.__modules.iteritems()):
+            if module['low_net'] is None:
+                continue
+            for other, lower in sorted(self.__modules.iteritems()):
+                if lower['high_net'] == module['low_net']:
+                    self.__lower[name].append(other)
+                    self.__upper[other].append(name)
+
+    def get_module(self, name):
+        """Get a module as a dict of its mem_module row, None if unknown"""
+        return self.__modules.get(name)
+
+    def get_modules(self, level=None):
+        """Get names of all modules, or those of one level, sorted"""
+        return sorted(name for name, module in self.__modules.iteritems()
+                      if level is None or module['level'] == level)
+
+    def get_nets(self):
+        """Get networks as a dict of number of nodes keyed by name"""
+        return dict(self.__nets)
+
+    def get_level(self, name):
+        """Get level of a module, None for modules not in the hierarchy"""
+        module = self.__modules.get(name)
+        return None if module is None else module['level']
+
+    def get_levels(self):
+        """Get level of every module as a dict keyed by name"""
+        return dict((name, module['level'])
+                    for name, module in self.__modules.iteritems())
+
+    def get_lower(self, name):
+        """Get modules a module sends its requests down to"""
+        return list(self.__lower.get(name, []))
+
+    def get_upper(self, name):
+        """Get modules sending their requests down to a module"""
+        return list(self.__upper.get(name, []))
+
+    def get_net(self, upper, lower):
+        """Get network linking a module to a module below it, None if they
+        are not linked"""
+        if lower not in self.__lower.get(upper, []):
+            return None
+        return self.__modules[upper]['low_net']
+
+    def get_path(self, source, target):
+        """Get modules on the way from source down to target, both
+        included, None if requests of source never reach target"""
+        paths = {source: [source]}
+        pending = [source]
+        while pending:
+            name = pending.pop(0)
+            if name == target:
+                return paths[name]
+            for lower in self.__lower.get(name, []):
+                if lower not in paths:
+                    paths[lower] = paths[name] + [lower]
+                    pending.append(lower)
+        return None
+
+
+def load_topology(database):
+    """Build the graph of the memory hierarchy of a trace database"""
+    cursor = database.cursor()
+    columns = [name for name, _ in MEM_MODULE_SCHEMA]
+    modules = [dict(zip(columns, row)) for row in cursor.execute(
+        'SELECT ' + ', '.join(columns) + ' FROM mem_module')]
+    nets = cursor.execute('SELECT name, num_nodes FROM mem_net').fetchall()
+    return TopologyGraph(modules, nets)
@@ -7,25 +7,20 @@ import numpy as np
 import pandas as pd
 from bokeh.charts import Histogram, Donut
 
-import tracedatabase as td
+import tracestore as ts
 import tracemisc as tm
 
 
-class Trace(object):
+class Trace(ts.TraceStore):
     """ Trace of Multi2Sim """
 
     def __init__(self, file_name):
+        super(Trace, self).__init__(file_name)
 
         # Trace information
         self.__file_name = file_name
         self.__color = tm.get_random_color()
 
-        # Load database
-        self.__database = td.load_database(self.__file_name)
-
-    def __build_database(self):
-        self.__database = td.load_database(self.__file_name)
-
     def get_file_name(self):
         """ Get file name """
         try:
@@ -62,52 +57,9 @@ class Trace(object):
         """ Get color assigned to trace """
         return self.__color
 
-    def get_db(self):
-        """ Get database """
-        return self.__database
-
-    def get_column(self, table_name, column_name):
-        """ Get a column from database """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + column_name + ' FROM ' + table_name
-
-        return cursor.execute(sql_query)
-
-    def get_column_with_func_cond(self,
-                                  table_name, column_name,
-                                  func_name, conditions=''):
-        """ Get a column from database, apply with function """
-        if self.__database is None:
-            self.__build_database()
-
-        cursor = self.__database.cursor()
-        sql_query = 'SELECT ' + func_name
-        sql_query += '(' + column_name + ') FROM ' + table_name + ' '
-        sql_query += conditions
-        return cursor.execute(sql_query).fetchone()[0]
-
-    def get_max(self, table_name, column_name, conditions=''):
-        """ Get the maximum of a column from database """
-        return int(self.get_column_with_func_cond(table_name, column_name,
-                                                  'MAX', conditions))
-
-    def get_sum(self, table_name, column_name, conditions=''):
-        """ Get the sum of a column from database """
-        return int(self.get_column_with_func_cond(table_name, column_name,
-                                                  'SUM', conditions))
-
-    def get_count(self, table_name, column_name, conditions=''):
-        """ Get the count of a column from database """
-        return int(self.get_column_with_func_cond(table_name, column_name,
-                                                  'COUNT', conditions))
-
     def print_table_columns_with_func(self, table_name, func_name):
         """ Print table columns information """
-        cursor = self.__database.cursor()
-        cursor.execute('SELECT * from ' + table_name)
+        cursor = self.get_db().execute('SELECT * from ' + table_name)
 
         field_names = [i[0] for i in cursor.description]
         print 'Table: ' + table_name
@@ -184,7 +136,7 @@ class Trace(object):
         """ Get all memory access types """
         sql_query = 'SELECT DISTINCT access_location, access_type FROM memory '
         sql_query += 'ORDER by  access_location, access_type'
-        dataframe = pd.read_sql_query(sql_query, self.get_db())
+        dataframe = self.read_sql_query(sql_query)
         return dataframe
 
     def __get_memory_access_types(self, mode='overview'):
@@ -226,7 +178,7 @@ class Trace(object):
             sql_query = 'SELECT length FROM memory'
             sql_query += ' WHERE ' + value
             sql_query += ' ORDER by line'
-            dataframe = pd.read_sql_query(sql_query, self.get_db())
+            dataframe = self.read_sql_query(sql_query)
 
             color = tm.get_random_color()
 
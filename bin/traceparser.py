@@ -74,7 +74,8 @@ def get_asm(line):
 
 
 def get_inst_type(line):
-    """ Decode instruction type """
+    """ Decode instruction type from the words of its asm, unlike the
+    traceISA.INST_* flags that come from the ISA unit """
     asm = parse_as_string('asm', line)
 
     is_scalar = 0
@@ -82,10 +83,11 @@ def get_inst_type(line):
     is_load = 0
     is_ds = 0
 
-    if asm.split('_')[0] == 's':
+    prefix = asm.split('_')[0]
+    if prefix == 's':
         is_scalar = 1
 
-    if asm.split('_')[0] == 'ds':
+    if prefix == 'ds':
         is_ds = 1
 
     if 'load' in asm:
@@ -95,7 +97,7 @@ def get_inst_type(line):
         is_mem = 1
         is_load = 0
 
-    return is_scalar << 3 + is_mem << 2 + is_load << 1 + is_ds
+    return (is_scalar << 3) | (is_mem << 2) | (is_load << 1) | is_ds
 
 
 def get_name(line):
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+""" This module contains a threaded reader of compressed traces """
+
+import distutils.spawn
+import mmap
+import os
+import subprocess
+import threading
+import zlib
+import Queue
+
+# Bytes read from the trace at once
+BLOCK_SIZE = 1024 * 1024
+
+# Batches decompressed ahead of the parser
+QUEUE_BATCHES = 8
+
+# Suffix -> external decompressor writing to stdout
+DECOMPRESSORS = {'.gz': ('pigz', '-dc'),
+                 '.zst': ('zstd', '-dcq'),
+                 '.lz4': ('lz4', '-dcq')}
+
+COMPRESSED_SUFFIXES = tuple(DECOMPRESSORS.keys())
+
+
+def get_suffix(trace_name):
+    """ Get compression suffix of a trace, '' if it is not compressed """
+    for suffix in COMPRESSED_SUFFIXES:
+        if trace_name.endswith(suffix):
+            return suffix
+    return ''
+
+
+def is_compressed(trace_name):
+    """ Check if a trace is compressed in a format the reader knows """
+    return get_suffix(trace_name) != ''
+
+
+class GzipBlockReader(object):
+    """ Decompress gzip blocks with zlib, concatenated members included """
+
+    def __init__(self, trace_name):
+        self.__trace = open(trace_name, 'rb')
+        self.__decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.__tail = ''
+
+    def read(self, size):
+        """ Decompress up to size bytes of trace, '' at end of file """
+        while True:
+            if not self.__tail:
+                self.__tail = self.__trace.read(size)
+                if not self.__tail:
+                    return self.__decompressor.flush()
+            data = self.__decompressor.decompress(self.__tail, size)
+            self.__tail = self.__decompressor.unconsumed_tail
+            if self.__decompressor.unused_data:
+                # Next gzip member starts right after this one
+                self.__tail = self.__decompressor.unused_data
+                self.__decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if data:
+                return data
+
+    def close(self):
+        """ Close trace """
+        self.__trace.close()
+
+
+class ProcessReader(object):
+    """ Read the stdout of an external decompressor """
+
+    def __init__(self, command):
+        self.__process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                          bufsize=BLOCK_SIZE)
+
+    def read(self, size):
+        """ Read up to size decompressed bytes, '' at end of file """
+        return self.__process.stdout.read(size)
+
+    def close(self):
+        """ Wait for the decompressor and check it succeeded """
+        self.__process.stdout.close()
+        if self.__process.wait() != 0:
+            raise IOError('Decompressor failed with exit code ' +
+                          str(self.__process.returncode))
+
+
+def open_trace(trace_name):
+    """ Open a trace as a stream of decompressed bytes
+
+    An external decompressor (pigz, zstd, lz4) is used when installed,
+    otherwise zlib or the zstandard/lz4 python modules.
+    """
+    suffix = get_suffix(trace_name)
+    if suffix == '':
+        return open(trace_name, 'rb')
+
+    tool = DECOMPRESSORS[suffix]
+    if distutils.spawn.find_executable(tool[0]):
+        return ProcessReader(list(tool) + [trace_name])
+
+    if suffix == '.gz':
+        return GzipBlockReader(trace_name)
+
+    if suffix == '.zst':
+        try:
+            import zstandard
+        except ImportError:
+            raise IOError('Install zstd or "pip install zstandard" to read ' +
+                          trace_name)
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(trace_name, 'rb'))
+
+    try:
+        import lz4.frame
+    except ImportError:
+        raise IOError('Install lz4 or "pip install lz4" to read ' +
+                      trace_name)
+    return lz4.frame.open(trace_name, 'rb')
+
+
+def __read_batches(trace_name, batches, start):
+    """ Split decompressed blocks into lines, run in the reader thread """
+    try:
+        trace = open_trace(trace_name)
+        try:
+            rest = ''
+            skip = start
+            while True:
+                block = trace.read(BLOCK_SIZE)
+                if not block:
+                    break
+                if skip:
+                    # Decompressed, but parsed before already
+                    if len(block) <= skip:
+                        skip -= len(block)
+                        continue
+                    block = block[skip:]
+                    skip = 0
+                lines = (rest + block).split('\n')
+                rest = lines.pop()
+                batches.put(lines)
+            if rest:
+                batches.put([rest])
+        finally:
+            trace.close()
+        batches.put(None)
+    except Exception as error:
+        batches.put(error)
+
+
+def find_line_end(trace_name, start, end):
+    """ Get offset right after the last newline in [start, end), start if
+    there is none, so a line still being written is left out """
+    if start >= end:
+        return start
+    with open(trace_name, 'rb') as trace:
+        trace_map = mmap.mmap(trace.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            newline = trace_map.rfind('\n', start, end)
+        finally:
+            trace_map.close()
+    return start if newline == -1 else newline + 1
+
+
+def iter_mapped_batches(trace_name, start=0, end=None):
+    """ Iterate over lists of lines of an uncompressed trace
+
+    The file is mapped and split in blocks ending at a newline, from byte
+    start up to byte end. Newlines are stripped.
+    """
+    with open(trace_name, 'rb') as trace:
+        size = os.fstat(trace.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return
+        trace_map = mmap.mmap(trace.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            position = start
+            while position < end:
+                block_end = min(position + BLOCK_SIZE, end)
+                if block_end < end:
+                    newline = trace_map.rfind('\n', position, block_end)
+                    if newline == -1:
+                        # Line longer than a block
+                        newline = trace_map.find('\n', block_end, end)
+                    block_end = end if newline == -1 else newline + 1
+                lines = trace_map[position:block_end].split('\n')
+                if lines[-1] == '':
+                    lines.pop()
+                yield lines
+                position = block_end
+        finally:
+            trace_map.close()
+
+
+def iter_batches(trace_name, start=0):
+    """ Iterate over lists of lines of a trace, newlines are stripped
+
+    Decompression runs in a background thread, at most QUEUE_BATCHES
+    batches ahead of the caller. Uncompressed traces are mapped instead.
+    start is an offset in the decompressed trace, at the start of a line.
+    """
+    if not is_compressed(trace_name):
+        for batch in iter_mapped_batches(trace_name, start):
+            yield batch
+        return
+
+    batches = Queue.Queue(QUEUE_BATCHES)
+    reader = threading.Thread(target=__read_batches,
+                              args=(trace_name, batches, start))
+    reader.daemon = True
+    reader.start()
+
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        if isinstance(batch, Exception):
+            raise batch
+        yield batch
+    reader.join()
+
+
+def get_batch_size(batch):
+    """ Get number of trace bytes a batch of lines was split from """
+    return sum(map(len, batch)) + len(batch)
+
+
+def iter_lines(trace_name):
+    """ Iterate over lines of a trace, newlines are stripped """
+    for batch in iter_batches(trace_name):
+        for line in batch:
+            yield line
@@ -42,16 +42,57 @@ REGEX_MEM_END = re.compile(ur'mem.end_access name="A-(?P<id>\d+)"')
 
 # eg: mem.new_access_block cache="l2-4" access="A-64385" set=37 way=14
 REGEX_MEM_NEW_BLK = re.compile(ur'mem.new_access_block '
-                               r'cache="(?P<cache>(?P<level>\w+)-'
+                               r'cache="(?P<cache>(?P<level>[\w-]+)-'
                                r'(?P<module>\w+))" access="(?P<id>A-\d+)" '
                                r'set=(?P<set>\d+) way=(?P<way>\d+)')
 
 # eg: mem.end_access_block cache="l2-3" access="A-16705" set=101 way=15
 REGEX_MEM_END_BLK = re.compile(ur'mem.end_access_block '
-                               r'cache="(?P<cache>(?P<level>\w+)-'
+                               r'cache="(?P<cache>(?P<level>[\w-]+)-'
                                r'(?P<module>\w+))" access="(?P<id>A-\d+)" '
                                r'set=(?P<set>\d+) way=(?P<way>\d+)')
 
+# eg: mem.set_block cache="mm-4" set=3 way=7 tag=0xc580 state="E"
+REGEX_MEM_SET_BLK = re.compile(ur'mem.set_block cache="(?P<cache>[^\"]+)" '
+                               r'set=(?P<set>\d+) way=(?P<way>\d+) '
+                               r'tag=(?P<tag>\w+) state="(?P<state>\w*)"')
+
+# eg: mem.set_owner dir="mm-4" x=3 y=7 z=0 owner=-1
+#     mem.set_sharer dir="mm-4" x=3 y=7 z=0 sharer=1
+#     mem.clear_sharer dir="l2-0" x=0 y=15 z=0 sharer=6
+REGEX_MEM_DIR = re.compile(ur'mem.(?P<action>\w+) dir="(?P<cache>[^\"]+)" '
+                           r'x=(?P<x>\d+) y=(?P<y>\d+) z=(?P<z>\d+) '
+                           r'\w+=(?P<node>-?\d+)')
+
+# eg: si.map_wg cu=0 wg=0 wi_first=0 wi_count=512 wf_first=0 wf_count=8
+REGEX_WG_MAP = re.compile(ur'si.map_wg cu=(?P<cu>\d+) wg=(?P<wg>\d+) '
+                          r'wi_first=(?P<wi_first>\d+) '
+                          r'wi_count=(?P<wi_count>\d+) '
+                          r'wf_first=(?P<wf_first>\d+) '
+                          r'wf_count=(?P<wf_count>\d+)')
+
+# eg: si.unmap_wg cu=1 wg=1
+REGEX_WG_UNMAP = re.compile(ur'si.unmap_wg cu=(?P<cu>\d+) wg=(?P<wg>\d+)')
+
+# eg: mem.new_net name="net-l2-0-to-mm-0" num_nodes=3
+REGEX_MEM_NEW_NET = re.compile(ur'mem.new_net name="(?P<name>[^\"]*)" '
+                               r'num_nodes=(?P<num_nodes>\d+)')
+
+# eg: mem.new_mod name="l2-0" num_sets=128 assoc=16 block_size=64
+#     sub_block_size=64 num_sharers=47 level=2 high_net="net-l1-all-to-l2-all"
+#     high_net_node=0 low_net="net-l2-0-to-mm-0" low_net_node=1
+REGEX_MEM_NEW_MOD = re.compile(ur'mem.new_mod name="(?P<name>[^\"]*)" '
+                               r'num_sets=(?P<num_sets>\d+) '
+                               r'assoc=(?P<assoc>\d+) '
+                               r'block_size=(?P<block_size>\d+) '
+                               r'sub_block_size=(?P<sub_block_size>\d+) '
+                               r'num_sharers=(?P<num_sharers>\d+) '
+                               r'level=(?P<level>\d+) '
+                               r'high_net="(?P<high_net>[^\"]*)" '
+                               r'high_net_node=(?P<high_net_node>\d+) '
+                               r'low_net="(?P<low_net>[^\"]*)" '
+                               r'low_net_node=(?P<low_net_node>\d+)')
+
 
 def parse(regex, line):
     """Parse line"""
@@ -83,6 +124,16 @@ def parse_inst_end(line):
     return parse(REGEX_INST_END, line)
 
 
+def parse_wg_map(line):
+    """Parse si.map_wg line"""
+    return parse(REGEX_WG_MAP, line)
+
+
+def parse_wg_unmap(line):
+    """Parse si.unmap_wg line"""
+    return parse(REGEX_WG_UNMAP, line)
+
+
 def parse_mem_new(line):
     """Parse mem.new_access line"""
     return parse(REGEX_MEM_NEW, line)
@@ -93,11 +144,36 @@ def parse_mem_acc(line):
     return parse(REGEX_MEM_ACC, line)
 
 
+def parse_mem_new_blk(line):
+    """Parse mem.new_access_block line"""
+    return parse(REGEX_MEM_NEW_BLK, line)
+
+
 def parse_mem_end_blk(line):
     """Parse mem.end_access_block line"""
     return parse(REGEX_MEM_END_BLK, line)
 
 
+def parse_mem_set_blk(line):
+    """Parse mem.set_block line"""
+    return parse(REGEX_MEM_SET_BLK, line)
+
+
+def parse_mem_dir(line):
+    """Parse mem.set_owner, mem.set_sharer and mem.clear_sharer lines"""
+    return parse(REGEX_MEM_DIR, line)
+
+
+def parse_mem_new_net(line):
+    """Parse mem.new_net line"""
+    return parse(REGEX_MEM_NEW_NET, line)
+
+
+def parse_mem_new_mod(line):
+    """Parse mem.new_mod line"""
+    return parse(REGEX_MEM_NEW_MOD, line)
+
+
 def parse_mem_end(line):
     """Parse mem.end_access line"""
     return parse(REGEX_MEM_END, line)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+""" This module contains the data access object shared by all visualizers """
+
+import os
+import sqlite3
+
+import tracedatabase as td
+import traceinfo as ti
+import tracesummary as ts
+import tracecache as tq
+
+# Read tuning of pooled connections
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_KIB = 64 * 1024
+CACHED_STATEMENTS = 256
+
+# Tables written for the tools themselves, not trace data
+INTERNAL_TABLES = ('summary', 'metadata', 'manifest')
+
+# Database file path -> read-only connection, shared by every TraceStore
+POOL = {}
+
+
+def open_database(trace_name):
+    """ Get the pooled read-only connection of a trace, build it if needed """
+    db_name = os.path.abspath(td.get_database_name(trace_name))
+    if db_name in POOL:
+        return POOL[db_name]
+
+    # Builds the database and its summary table when missing
+    td.load_database(trace_name).close()
+
+    database = sqlite3.connect(db_name, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+    database.execute('PRAGMA query_only=ON')
+    database.execute('PRAGMA mmap_size=' + str(MMAP_SIZE))
+    database.execute('PRAGMA cache_size=-' + str(CACHE_KIB))
+    POOL[db_name] = database
+    return database
+
+
+def close_databases():
+    """ Close all pooled connections """
+    for database in POOL.values():
+        database.close()
+    POOL.clear()
+
+
+class TraceStore(object):
+    """ Queries of a trace database
+
+    Values go to the query as parameters (?), only table and column names
+    and conditions written by the tools are part of the SQL text.
+    """
+
+    def __init__(self, trace_name, backend='sqlite'):
+        self.__database = open_database(trace_name)
+        self.__summary = None
+
+        # Categorical column -> {code: value}, loaded on first decode
+        self.__dictionaries = {}
+
+        # Graph of the memory hierarchy, loaded on first use
+        self.__topology = None
+
+        # Column store for scans, aggregates still come from the database
+        self.__columns = None
+        if backend == 'columnar':
+            self.__columns = td.get_column_store(self.__database,
+                                                 trace_name)
+
+    def get_db(self):
+        """ Get database """
+        return self.__database
+
+    def get_snapshot(self):
+        """ Get what tells apart states of the database, it changes every
+        time a follower commits more of the trace """
+        metadata = td.get_metadata(self.__database)
+        return (metadata.get('offset'), metadata.get('complete'))
+
+    def get_column_store(self):
+        """ Get column store, None unless the columnar backend is used """
+        return self.__columns
+
+    def get_column(self, table, column):
+        """ Get a column from database """
+        sql_query = 'SELECT ' + column + ' FROM ' + table
+        return self.__database.execute(sql_query)
+
+    def read_sql_query(self, sql_query, params=()):
+        """ Get result of a query as a dataframe """
+        return tq.read_sql_query(sql_query, self.__database, params)
+
+    def get_dictionary(self, column):
+        """ Get values of a categorical column as a dict keyed by code """
+        if column not in self.__dictionaries:
+            sql_query = 'SELECT code, value FROM ' + \
+                ti.get_dictionary_table(column)
+            self.__dictionaries[column] = dict(
+                self.__database.execute(sql_query))
+        return self.__dictionaries[column]
+
+    def encode(self, column, value):
+        """ Get code of a value of a categorical column, None if unknown """
+        sql_query = 'SELECT code FROM ' + ti.get_dictionary_table(column)
+        sql_query += ' WHERE value=?'
+        row = self.__database.execute(sql_query, (value,)).fetchone()
+        return None if row is None else row[0]
+
+    def decode(self, dataframe, columns):
+        """ Replace codes of categorical columns of a dataframe by values """
+        for column in columns:
+            values = self.get_dictionary(column)
+            codes = dataframe[column]
+            if not set(codes.dropna()).issubset(values):
+                # Added since loaded, the trace is still being followed
+                del self.__dictionaries[column]
+                values = self.get_dictionary(column)
+            dataframe[column] = codes.map(values)
+        return dataframe
+
+    def get_topology(self):
+        """ Get graph of the memory hierarchy """
+        if self.__topology is None:
+            self.__topology = ti.load_topology(self.__database)
+        return self.__topology
+
+    def get_column_with_func_cond(self,
+                                  table, column,
+                                  func_name, conditions='', params=()):
+        """ Get a column from database, apply with function """
+        # Aggregates over a whole table or a cu are summarized at ingest
+        if self.__summary is None:
+            self.__summary = ts.Summary(self.__database)
+        try:
+            return self.__summary.get(table, column, func_name,
+                                      conditions, params)
+        except KeyError:
+            pass
+
+        sql_query = 'SELECT ' + func_name
+        sql_query += '(' + column + ') FROM ' + table + ' '
+        sql_query += conditions
+        return tq.fetch_value(self.__database, sql_query, params)
+
+    def get_max(self, table, column, conditions='', params=()):
+        """ Get the maximum of a column from database """
+        return int(self.get_column_with_func_cond(table, column,
+                                                  'MAX', conditions, params))
+
+    def get_sum(self, table, column, conditions='', params=()):
+        """ Get the sum of a column from database """
+        return int(self.get_column_with_func_cond(table, column,
+                                                  'SUM', conditions, params))
+
+    def get_count(self, table, column, conditions='', params=()):
+        """ Get the count of a column from database """
+        return int(self.get_column_with_func_cond(table, column,
+                                                  'COUNT', conditions, params))
+
+    def get_column_list(self, table):
+        """Get all columns as a list"""
+        sql_query = "PRAGMA table_info(" + table + ")"
+        column_list = []
+        for item in self.__database.execute(sql_query):
+            if item[1] != 'cycle':
+                column_list.append(item[1])
+        return sorted(column_list)
+
+    def get_table_list(self):
+        """Get all tables as a list"""
+        cursor = self.__database.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' "
+            "AND name NOT LIKE 'sqlite_%'")
+        table_list = []
+        for item in cursor.fetchall():
+            if item[0] not in INTERNAL_TABLES and \
+                    not ti.is_dictionary_table(item[0]):
+                table_list.append(item[0])
+        return sorted(table_list)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+""" This module contains the aggregate summary table of a trace database """
+
+import re
+import traceinfo as ti
+
+# Pointers to rows of other tables, laid out differently by every build
+REFERENCE_COLUMNS = ('inst_rowid',)
+
+# Tables describing the database rather than the trace
+SKIP_TABLES = ('summary', 'metadata', 'manifest')
+
+# Expressions the visualizers aggregate besides plain columns
+EXPRESSIONS = {'inst': ('start + length',)}
+
+FUNCTIONS = ('MIN', 'MAX', 'SUM', 'COUNT')
+
+SUMMARY_SCHEMA = (('table_name', 'TEXT'), ('column_name', 'TEXT'),
+                  ('cu', 'INTEGER'), ('min', ''), ('max', ''), ('sum', ''),
+                  ('count', 'INTEGER'))
+
+# The only condition the getters use besides none at all
+REGEX_CONDITION_CU = re.compile(r'^\s*WHERE\s+cu\s*=\s*(\d+|\?)\s*$',
+                                re.IGNORECASE)
+
+
+def normalize_column(column):
+    """ Normalize whitespace of a column or expression """
+    return ' '.join(column.split())
+
+
+def has_summary(database):
+    """ Check if database has a summary table """
+    cursor = database.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='summary'")
+    return cursor.fetchone() is not None
+
+
+def build_summary(database):
+    """ Aggregate every column of every table into the summary table,
+    except row pointers and categorical columns
+
+    Values are exactly what MIN/MAX/SUM/COUNT(column) return, for the whole
+    table (cu is NULL) and, for tables with a cu column, for each cu.
+    """
+    with database:
+        database.execute('DROP TABLE IF EXISTS summary')
+        database.execute('CREATE TABLE summary (' + ', '.join(
+            [(name + ' ' + sql_type).strip()
+             for name, sql_type in SUMMARY_SCHEMA]) + ')')
+
+        cursor = database.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' "
+                       "AND name NOT LIKE 'sqlite_%'")
+        for table, in cursor.fetchall():
+            if table in SKIP_TABLES or ti.is_dictionary_table(table):
+                continue
+            names = [item[1] for item in
+                     cursor.execute('PRAGMA table_info(' + table + ')')]
+            # Codes of categorical columns depend on the build just like
+            # row pointers, their aggregates mean nothing
+            skipped = REFERENCE_COLUMNS + ti.ENCODED_COLUMNS.get(table, ())
+            columns = [name for name in names if name not in skipped]
+            columns += EXPRESSIONS.get(table, ())
+            if not columns:
+                continue
+
+            # One scan per table, all aggregates at once
+            aggregates = []
+            for column in columns:
+                aggregates += [func + '(' + column + ')' for func in FUNCTIONS]
+
+            groups = [('NULL', '')]
+            if 'cu' in names:
+                groups.append(('cu', ' GROUP BY cu'))
+
+            for cu_column, group_by in groups:
+                sql_query = 'SELECT ' + cu_column + ', ' + \
+                    ', '.join(aggregates) + ' FROM ' + table + group_by
+                rows = []
+                for result in cursor.execute(sql_query).fetchall():
+                    for index, column in enumerate(columns):
+                        offset = 1 + index * len(FUNCTIONS)
+                        key = (table, normalize_column(column), result[0])
+                        rows.append(
+                            key + result[offset:offset + len(FUNCTIONS)])
+                database.executemany(
+                    'INSERT INTO summary VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+class Summary(object):
+    """ Aggregates of a database answered from its summary table """
+
+    def __init__(self, database):
+        self.__values = {}
+        if not has_summary(database):
+            return
+
+        sql_query = 'SELECT table_name, column_name, cu, ' + \
+            ', '.join(FUNCTIONS) + ' FROM summary'
+        for row in database.execute(sql_query):
+            self.__values[row[:3]] = dict(zip(FUNCTIONS, row[3:]))
+
+    def get(self, table, column, func_name, conditions='', params=()):
+        """ Get the aggregate of a column, raise KeyError if not summarized """
+        cu_id = None
+        if conditions.strip():
+            matched = REGEX_CONDITION_CU.match(conditions)
+            if matched is None:
+                raise KeyError(conditions)
+            if matched.group(1) == '?':
+                cu_id = int(params[0])
+            else:
+                cu_id = int(matched.group(1))
+
+        values = self.__values[(table, normalize_column(column), cu_id)]
+        return values[func_name.upper()]
@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+""" This module contains a single-pass tokenizer for trace lines """
+
+import collections
+import traceregex as tr
+
+# eg: c clk=1000
+Clock = collections.namedtuple('Clock', 'clock')
+
+# eg: si.new_inst id=69 cu=0 ib=0 wg=0 wf=5 uop_id=8 stg="f" asm="..."
+InstNew = collections.namedtuple(
+    'InstNew', 'uid id cu ib wg wf uop_id stage asm')
+
+# eg: si.inst id=60 cu=0 wf=4 uop_id=7 stg="su-r"
+InstExe = collections.namedtuple('InstExe', 'uid id cu wf uop_id stage')
+
+# eg: si.end_inst id=35 cu=3
+InstEnd = collections.namedtuple('InstEnd', 'uid id cu stage')
+
+# eg: si.map_wg cu=0 wg=0 wi_first=0 wi_count=512 wf_first=0 wf_count=8
+WgMap = collections.namedtuple(
+    'WgMap', 'uid cu wg wi_first wi_count wf_first wf_count')
+
+# eg: si.unmap_wg cu=1 wg=1
+WgUnmap = collections.namedtuple('WgUnmap', 'uid cu wg')
+
+# eg: mem.new_access name="A-227" type="load" state="l1-cu02:load" addr=0xc610
+MemNew = collections.namedtuple('MemNew', 'uid type module action addr')
+
+# eg: mem.access name="A-213" state="l1-cu0:find_and_lock"
+MemAcc = collections.namedtuple('MemAcc', 'uid module action')
+
+# eg: mem.end_access name="A-16512"
+MemEnd = collections.namedtuple('MemEnd', 'uid')
+
+# eg: mem.new_access_block cache="l2-4" access="A-1" set=3 way=15
+BlockNew = collections.namedtuple('BlockNew',
+                                  'uid cache access set_index way')
+
+# eg: mem.end_access_block cache="mm-4" access="A-1" set=3 way=7
+BlockEnd = collections.namedtuple('BlockEnd',
+                                  'uid cache access set_index way')
+
+# eg: mem.set_block cache="mm-4" set=3 way=7 tag=0xc580 state="E"
+BlockSet = collections.namedtuple('BlockSet', 'cache set_index way tag state')
+
+# eg: mem.set_owner dir="mm-4" x=3 y=7 z=0 owner=-1
+#     mem.set_sharer/mem.clear_sharer dir="mm-4" x=3 y=7 z=0 sharer=1
+DirSet = collections.namedtuple('DirSet',
+                                'action cache set_index way sub_block node')
+
+# eg: mem.new_net name="net-l2-0-to-mm-0" num_nodes=3
+NetNew = collections.namedtuple('NetNew', 'name num_nodes')
+
+# eg: mem.new_mod name="l2-0" num_sets=128 assoc=16 block_size=64
+#     sub_block_size=64 num_sharers=47 level=2 high_net="net-l1-all-to-l2-all"
+#     high_net_node=0 low_net="net-l2-0-to-mm-0" low_net_node=1
+ModNew = collections.namedtuple(
+    'ModNew', 'name num_sets assoc block_size sub_block_size num_sharers '
+    'level high_net high_net_node low_net low_net_node')
+
+INST_EVENTS = (InstNew, InstExe, InstEnd)
+WG_EVENTS = (WgMap, WgUnmap)
+MEM_EVENTS = (MemNew, MemAcc, MemEnd)
+CACHE_EVENTS = (BlockNew, BlockEnd, BlockSet, DirSet)
+TOPOLOGY_EVENTS = (NetNew, ModNew)
+
+# Events updating a record created by an earlier event with the same uid
+UPDATE_EVENTS = (InstExe, InstEnd, WgUnmap, MemAcc, MemEnd, BlockEnd)
+
+
+def inst_uid(cu_id, inst_id):
+    """Unique integer id of an instruction, ids restart on every cu"""
+    return (cu_id << 32) | inst_id
+
+
+def wg_uid(cu_id, wg_id):
+    """Unique integer id of a mapped work-group, ids restart on every
+    kernel"""
+    return (cu_id << 32) | wg_id
+
+
+def block_uid(cache, access_id):
+    """Unique id of a block held by an access, an access holds blocks of
+    several caches at once"""
+    return (cache, access_id)
+
+
+# Split-based extractors slice values at the fixed key offsets used by
+# Multi2Sim. A line with another layout raises IndexError or ValueError and is
+# handed to the regex fallback instead.
+
+def __split_clock(rest):
+    # clk=1000
+    return Clock(int(rest[4:]))
+
+
+def __split_inst_new(rest):
+    # id=69 cu=0 ib=0 wg=0 wf=5 uop_id=8 stg="f" asm="..."
+    fields = rest.split(' ', 7)
+    inst_id = int(fields[0][3:])
+    cu_id = int(fields[1][3:])
+    return InstNew(inst_uid(cu_id, inst_id), inst_id, cu_id,
+                   int(fields[2][3:]), int(fields[3][3:]),
+                   int(fields[4][3:]), int(fields[5][7:]),
+                   fields[6][5:-1], fields[7][5:fields[7].rindex('"')])
+
+
+def __split_inst_exe(rest):
+    # id=60 cu=0 wf=4 uop_id=7 stg="su-r"
+    fields = rest.split()
+    inst_id = int(fields[0][3:])
+    cu_id = int(fields[1][3:])
+    return InstExe(inst_uid(cu_id, inst_id), inst_id, cu_id,
+                   int(fields[2][3:]), int(fields[3][7:]), fields[4][5:-1])
+
+
+def __split_inst_end(rest):
+    # id=35 cu=3
+    fields = rest.split()
+    inst_id = int(fields[0][3:])
+    cu_id = int(fields[1][3:])
+    return InstEnd(inst_uid(cu_id, inst_id), inst_id, cu_id, 'end')
+
+
+def __split_wg_map(rest):
+    # cu=0 wg=0 wi_first=0 wi_count=512 wf_first=0 wf_count=8
+    fields = rest.split()
+    cu_id = int(fields[0][3:])
+    wg_id = int(fields[1][3:])
+    return WgMap(wg_uid(cu_id, wg_id), cu_id, wg_id, int(fields[2][9:]),
+                 int(fields[3][9:]), int(fields[4][9:]), int(fields[5][9:]))
+
+
+def __split_wg_unmap(rest):
+    # cu=1 wg=1
+    fields = rest.split()
+    cu_id = int(fields[0][3:])
+    wg_id = int(fields[1][3:])
+    return WgUnmap(wg_uid(cu_id, wg_id), cu_id, wg_id)
+
+
+def __split_mem_new(rest):
+    # name="A-227" type="load" state="l1-cu02:load" addr=0xc610
+    # Split on quotes, since states like "l1-cu00:nc store" contain spaces
+    fields = rest.split('"')
+    module, action = fields[5].split(':')
+    return MemNew(int(fields[1][2:]), fields[3], module, action,
+                  int(fields[6].strip()[5:], 16))
+
+
+def __split_mem_acc(rest):
+    # name="A-213" state="l1-cu0:find_and_lock"
+    fields = rest.split('"')
+    module, action = fields[3].split(':')
+    return MemAcc(int(fields[1][2:]), module, action)
+
+
+def __split_mem_end(rest):
+    # name="A-16512"
+    return MemEnd(int(rest.split('"')[1][2:]))
+
+
+def __split_block(event_type, rest):
+    # cache="l2-4" access="A-1" set=3 way=15
+    fields = rest.split('"')
+    access_id = int(fields[3][2:])
+    set_index, way = fields[4].split()
+    return event_type(block_uid(fields[1], access_id), fields[1], access_id,
+                      int(set_index[4:]), int(way[4:]))
+
+
+def __split_block_new(rest):
+    return __split_block(BlockNew, rest)
+
+
+def __split_block_end(rest):
+    return __split_block(BlockEnd, rest)
+
+
+def __split_block_set(rest):
+    # cache="mm-4" set=3 way=7 tag=0xc580 state="E"
+    fields = rest.split('"')
+    set_index, way, tag, _ = fields[2].split()
+    return BlockSet(fields[1], int(set_index[4:]), int(way[4:]),
+                    int(tag[4:], 16), fields[3])
+
+
+def __split_dir(action, rest):
+    # dir="mm-4" x=3 y=7 z=0 owner=-1
+    fields = rest.split('"')
+    set_index, way, sub_block, node = fields[2].split()
+    return DirSet(action, fields[1], int(set_index[2:]), int(way[2:]),
+                  int(sub_block[2:]), int(node.split('=')[1]))
+
+
+def __split_set_owner(rest):
+    return __split_dir('set_owner', rest)
+
+
+def __split_set_sharer(rest):
+    return __split_dir('set_sharer', rest)
+
+
+def __split_clear_sharer(rest):
+    return __split_dir('clear_sharer', rest)
+
+
+def __split_net_new(rest):
+    # name="net-l2-0-to-mm-0" num_nodes=3
+    fields = rest.split('"')
+    return NetNew(fields[1], int(fields[2].strip()[10:]))
+
+
+def __split_mod_new(rest):
+    # name="l2-0" num_sets=128 assoc=16 block_size=64 sub_block_size=64
+    # num_sharers=47 level=2 high_net="..." high_net_node=0 low_net="..."
+    # low_net_node=1
+    fields = rest.split('"')
+    sizes = [int(item.split('=')[1]) for item in fields[2].split()[:6]]
+    return ModNew(fields[1], sizes[0], sizes[1], sizes[2], sizes[3],
+                  sizes[4], sizes[5], fields[3],
+                  int(fields[4].split()[0][14:]), fields[5],
+                  int(fields[6].strip()[13:]))
+
+
+def __regex_clock(line):
+    info = tr.REGEX_CLOCK.search(line).groupdict()
+    return Clock(int(info['clock']))
+
+
+def __regex_inst_new(line):
+    info = tr.parse_inst_new(line).groupdict()
+    inst_id = int(info['id'])
+    cu_id = int(info['cu'])
+    return InstNew(inst_uid(cu_id, inst_id), inst_id, cu_id,
+                   int(info['ib']), int(info['wg']), int(info['wf']),
+                   int(info['uop_id']), info['stage'], info['asm'])
+
+
+def __regex_inst_exe(line):
+    info = tr.parse_inst_exe(line).groupdict()
+    inst_id = int(info['id'])
+    cu_id = int(info['cu'])
+    return InstExe(inst_uid(cu_id, inst_id), inst_id, cu_id,
+                   int(info['wf']), int(info['uop_id']), info['stage'])
+
+
+def __regex_inst_end(line):
+    info = tr.parse_inst_end(line).groupdict()
+    inst_id = int(info['id'])
+    cu_id = int(info['cu'])
+    return InstEnd(inst_uid(cu_id, inst_id), inst_id, cu_id, 'end')
+
+
+def __regex_wg_map(line):
+    info = tr.parse_wg_map(line).groupdict()
+    cu_id = int(info['cu'])
+    wg_id = int(info['wg'])
+    return WgMap(wg_uid(cu_id, wg_id), cu_id, wg_id, int(info['wi_first']),
+                 int(info['wi_count']), int(info['wf_first']),
+                 int(info['wf_count']))
+
+
+def __regex_wg_unmap(line):
+    info = tr.parse_wg_unmap(line).groupdict()
+    cu_id = int(info['cu'])
+    wg_id = int(info['wg'])
+    return WgUnmap(wg_uid(cu_id, wg_id), cu_id, wg_id)
+
+
+def __regex_mem_new(line):
+    info = tr.parse_mem_new(line).groupdict()
+    return MemNew(int(info['id']), info['type'], info['module'],
+                  info['action'], int(info['addr'], 16))
+
+
+def __regex_mem_acc(line):
+    info = tr.parse_mem_acc(line).groupdict()
+    return MemAcc(int(info['id']), info['module'], info['action'])
+
+
+def __regex_mem_end(line):
+    info = tr.parse_mem_end(line).groupdict()
+    return MemEnd(int(info['id']))
+
+
+def __regex_block(event_type, info):
+    access_id = int(info['id'][2:])
+    return event_type(block_uid(info['cache'], access_id), info['cache'],
+                      access_id, int(info['set']), int(info['way']))
+
+
+def __regex_block_new(line):
+    return __regex_block(BlockNew, tr.parse_mem_new_blk(line).groupdict())
+
+
+def __regex_block_end(line):
+    return __regex_block(BlockEnd, tr.parse_mem_end_blk(line).groupdict())
+
+
+def __regex_block_set(line):
+    info = tr.parse_mem_set_blk(line).groupdict()
+    return BlockSet(info['cache'], int(info['set']), int(info['way']),
+                    int(info['tag'], 16), info['state'])
+
+
+def __regex_dir(line):
+    info = tr.parse_mem_dir(line).groupdict()
+    return DirSet(info['action'], info['cache'], int(info['x']),
+                  int(info['y']), int(info['z']), int(info['node']))
+
+
+def __regex_net_new(line):
+    info = tr.parse_mem_new_net(line).groupdict()
+    return NetNew(info['name'], int(info['num_nodes']))
+
+
+def __regex_mod_new(line):
+    info = tr.parse_mem_new_mod(line).groupdict()
+    return ModNew(info['name'], int(info['num_sets']), int(info['assoc']),
+                  int(info['block_size']), int(info['sub_block_size']),
+                  int(info['num_sharers']), int(info['level']),
+                  info['high_net'], int(info['high_net_node']),
+                  info['low_net'], int(info['low_net_node']))
+
+
+# Record prefix -> (split-based extractor, precompiled regex fallback)
+RECORDS = {
+    'c': (__split_clock, __regex_clock),
+    'si.new_inst': (__split_inst_new, __regex_inst_new),
+    'si.inst': (__split_inst_exe, __regex_inst_exe),
+    'si.end_inst': (__split_inst_end, __regex_inst_end),
+    'si.map_wg': (__split_wg_map, __regex_wg_map),
+    'si.unmap_wg': (__split_wg_unmap, __regex_wg_unmap),
+    'mem.new_access': (__split_mem_new, __regex_mem_new),
+    'mem.access': (__split_mem_acc, __regex_mem_acc),
+    'mem.end_access': (__split_mem_end, __regex_mem_end),
+    'mem.new_access_block': (__split_block_new, __regex_block_new),
+    'mem.end_access_block': (__split_block_end, __regex_block_end),
+    'mem.set_block': (__split_block_set, __regex_block_set),
+    'mem.set_owner': (__split_set_owner, __regex_dir),
+    'mem.set_sharer': (__split_set_sharer, __regex_dir),
+    'mem.clear_sharer': (__split_clear_sharer, __regex_dir),
+    'mem.new_net': (__split_net_new, __regex_net_new),
+    'mem.new_mod': (__split_mod_new, __regex_mod_new),
+}
+
+
+def tokenize(line):
+    """Classify a line by its record prefix and return a typed event"""
+    record, _, rest = line.partition(' ')
+    try:
+        split_func, regex_func = RECORDS[record]
+    except KeyError:
+        return None
+
+    try:
+        return split_func(rest)
+    except (IndexError, ValueError):
+        pass
+
+    # Field layout differs from what the splitter expects
+    try:
+        return regex_func(line)
+    except AttributeError:
+        return None